@@ -0,0 +1,140 @@
+import os
+import csv
+import queue
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+LOG_DB_PATH = "access_log.db"
+LEGACY_CSV_PATH = "access_log.csv"
+BATCH_SIZE = 500          # حداکثر تعداد ردیف در هر تراکنش
+FLUSH_INTERVAL = 0.5      # حداکثر تأخیر نوشتن یک ردیف (ثانیه)
+
+# اتصال نویسنده: ساخت جدول و شاخص‌ها در صورت نبودن
+def connect(db_path=LOG_DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS access_log (
+                        id INTEGER PRIMARY KEY,
+                        user_id TEXT NOT NULL,
+                        user_name TEXT NOT NULL,
+                        time TEXT NOT NULL,
+                        camera TEXT)""")
+    # پایگاه‌های ساخته‌شده پیش از ثبت نام دوربین
+    if "camera" not in [row[1] for row in conn.execute("PRAGMA table_info(access_log)")]:
+        conn.execute("ALTER TABLE access_log ADD COLUMN camera TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS access_log_time ON access_log (time, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS access_log_user ON access_log (user_id, time, id)")
+    return conn
+
+# اتصال فقط‌خواندنی برای نمایش گزارش‌ها؛ بدون ساخت جدول و بدون قفل نوشتن
+def connect_readonly(db_path=LOG_DB_PATH):
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True, timeout=10)
+
+# انتقال یک‌باره گزارش‌های قدیمی CSV به پایگاه داده هنگام شروع نویسنده (فقط وقتی پایگاه خالی است)؛
+# فایل CSV پس از آن تغییر نام می‌دهد تا دیگر بررسی نشود
+def import_csv(conn, csv_path=LEGACY_CSV_PATH):
+    if not os.path.exists(csv_path):
+        return 0
+    count = 0
+    with conn:
+        if conn.execute("SELECT 1 FROM access_log LIMIT 1").fetchone() is None:
+            with open(csv_path, encoding="utf-8") as f:
+                rows = [row for row in csv.reader(f) if len(row) == 3]
+            conn.executemany("INSERT INTO access_log (user_id, user_name, time) VALUES (?, ?, ?)", rows)
+            count = len(rows)
+    os.replace(csv_path, csv_path + ".imported")
+    print(f"[✔] {count} گزارش از '{csv_path}' منتقل شد؛ فایل به '{csv_path}.imported' تغییر نام داد.")
+    return count
+
+# نوشتن گزارش‌ها در رشته پس‌زمینه؛ ردیف‌ها دسته‌ای و در یک تراکنش ذخیره می‌شوند
+class AccessLogWriter:
+    def __init__(self, db_path=LOG_DB_PATH, csv_path=LEGACY_CSV_PATH):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="AccessLogWriter", daemon=True)
+        self.thread.start()
+
+    def write(self, user_id, user_name, time=None, camera=None):
+        time = time or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.queue.put((str(user_id), str(user_name), time, camera))
+
+    def _run(self):
+        conn = connect(self.db_path)
+        import_csv(conn, self.csv_path)
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=FLUSH_INTERVAL)]
+            except queue.Empty:
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None نشانه بستن است
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if batch:
+                with conn:
+                    conn.executemany("INSERT INTO access_log (user_id, user_name, time, camera) VALUES (?, ?, ?, ?)", batch)
+        conn.close()
+
+    # ذخیره ردیف‌های باقی‌مانده و بستن رشته
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+writer = None
+writer_lock = threading.Lock()
+
+# راه‌اندازی نویسنده مشترک؛ رابط‌های کاربری هنگام شروع آن را صدا می‌زنند تا انتقال CSV قدیمی در پس‌زمینه انجام شود
+def start_writer():
+    global writer
+    with writer_lock:
+        if writer is None:
+            writer = AccessLogWriter()
+            atexit.register(writer.close)
+        return writer
+
+# ثبت ورود موفق بدون مسدود کردن رابط کاربری؛ camera برای ورودهای ثبت‌شده توسط سرویس چنددوربینی
+def log_access(user_id, user_name, camera=None, time=None):
+    start_writer().write(user_id, user_name, time, camera)
+
+# جست‌وجوی گزارش‌ها از جدیدترین به قدیمی‌ترین؛ صفحه بعد با after=(time, id) آخرین ردیف صفحه قبل
+def query_logs(start=None, end=None, user_id=None, limit=200, after=None, db_path=LOG_DB_PATH):
+    conditions, params = [], []
+    if user_id:
+        conditions.append("user_id = ?")
+        params.append(str(user_id))
+    if start:
+        conditions.append("time >= ?")
+        params.append(start)
+    if end:
+        conditions.append("time <= ?")
+        params.append(end)
+    if after:
+        conditions.append("(time, id) < (?, ?)")
+        params.extend(after)
+
+    sql = "SELECT id, user_id, user_name, time FROM access_log"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY time DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    if not os.path.exists(db_path):
+        return []
+    conn = connect_readonly(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
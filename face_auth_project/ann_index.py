@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import numpy as np
+from model_manager import MODEL_PATH, binary_model_path, load_binary_model
+from lbph_matcher import LbphMatcher, load_matcher
+
+MIN_GALLERY = 1000       # زیر این تعداد نمونه جست‌وجوی دقیق سریع‌تر یا هم‌اندازه است؛ شاخص ساخته نمی‌شود
+RECALL_TARGET = 0.95     # n_probe کوچک‌ترین مقداری است که به این recall@1 (نسبت به جست‌وجوی دقیق) برسد
+RECALL_QUERIES = 256     # تعداد نمونه‌هایی که برای سنجش recall هنگام ساخت شاخص استفاده می‌شوند
+KMEANS_ITERATIONS = 10
+SAMPLES_PER_LIST = 64    # تعداد نمونه‌های آموزش k-means به ازای هر فهرست
+
+# مسیر شاخص تقریبی کنار فایل مدل
+def index_path(model_path):
+    return os.path.splitext(model_path)[0] + ".ivf.npz"
+
+# نزدیک‌ترین مرکز به هر هیستوگرام با همان فاصله Chi-Square؛ چون فاصله متقارن است،
+# فاصله هر مرکز تا همه نقاط یک‌جا و برداری محاسبه می‌شود
+def nearest_centroids(histograms, centroids):
+    points = LbphMatcher(histograms, np.arange(len(histograms)))
+    distances = np.stack([points.distances(centroid) for centroid in centroids], axis=1)
+    return np.argmin(distances, axis=1)
+
+# خوشه‌بندی درشت هیستوگرام‌ها با k-means؛ خروجی مراکز و شماره فهرست هر نمونه
+def build_index(histograms, n_lists=None, iterations=KMEANS_ITERATIONS, seed=0):
+    count = len(histograms)
+    n_lists = min(count, n_lists or max(1, int(np.sqrt(count))))
+    rng = np.random.default_rng(seed)
+
+    sample = histograms[np.sort(rng.choice(count, min(count, n_lists * SAMPLES_PER_LIST), replace=False))]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(sample, centroids)
+        for k in range(n_lists):
+            members = sample[assignments == k]
+            # فهرست خالی با یک نمونه تصادفی دوباره مقداردهی می‌شود
+            centroids[k] = members.mean(axis=0) if len(members) else sample[rng.integers(len(sample))]
+
+    assignments = nearest_centroids(histograms, centroids).astype(np.int32)
+    return centroids.astype(np.float32), assignments
+
+# انتخاب n_probe از روی recall اندازه‌گیری‌شده: برای چند نمونه گالری نزدیک‌ترین نمونه دیگر با جست‌وجوی دقیق
+# پیدا می‌شود و n_probe کوچک‌ترین تعداد فهرستی است که فهرست آن نمونه را در دست‌کم target موارد پوشش دهد
+def choose_n_probe(histograms, centroids, assignments, target=RECALL_TARGET, queries=RECALL_QUERIES, seed=0):
+    count = len(histograms)
+    if count < 2:
+        return 1
+    rng = np.random.default_rng(seed)
+    exact = LbphMatcher(histograms, np.arange(count))
+    coarse = LbphMatcher(centroids, np.arange(len(centroids)))
+    ranks = []
+    for i in rng.choice(count, min(count, queries), replace=False):
+        dist = exact.distances(histograms[i])
+        dist[i] = np.inf
+        order = np.argsort(coarse.distances(histograms[i]), kind="stable")
+        ranks.append(int(np.flatnonzero(order == assignments[np.argmin(dist)])[0]))
+    return int(np.quantile(ranks, target, method="higher")) + 1
+
+def write_index(model_path, centroids, assignments, labels, n_probe, source_stamp):
+    path = index_path(model_path)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, centroids=centroids, assignments=assignments, labels=np.asarray(labels, dtype=np.int32),
+             n_probe=np.int32(n_probe), source_stamp=np.array(source_stamp, dtype=np.int64))
+    os.replace(tmp_path, path)
+    return path
+
+# آیا شاخص موجود با فایل مدل فعلی ساخته شده است؟
+def index_is_current(model_path=MODEL_PATH):
+    path = index_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return False
+    stat = os.stat(model_path)
+    with np.load(path) as index:
+        return tuple(index["source_stamp"].tolist()) == (stat.st_size, stat.st_mtime_ns)
+
+# ساخت شاخص از نسخه باینری مدل و ذخیره آن کنار trained_model.yml؛ برای گالری کوچک‌تر از min_gallery
+# شاخص ساخته نمی‌شود و شاخص قدیمی حذف می‌شود تا جست‌وجوی دقیق استفاده شود
+def save_index(model_path=MODEL_PATH, n_lists=None, min_gallery=MIN_GALLERY):
+    start = time.perf_counter()
+    model = load_binary_model(binary_model_path(model_path))
+    path = index_path(model_path)
+    if len(model["histograms"]) == 0 or len(model["histograms"]) < min_gallery:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    centroids, assignments = build_index(model["histograms"], n_lists)
+    n_probe = choose_n_probe(model["histograms"], centroids, assignments)
+    path = write_index(model_path, centroids, assignments, model["labels"], n_probe, model["source_stamp"])
+    print(f"[✔] شاخص تقریبی با {len(centroids)} فهرست (n_probe={n_probe}) در "
+          f"{(time.perf_counter() - start) * 1000:.0f}ms ساخته شد: '{path}'")
+
+# به‌روزرسانی تدریجی شاخص پس از ترکیب بخش‌ها: مراکز ثابت می‌مانند، نمونه‌های برچسب‌های تغییرکرده به نزدیک‌ترین
+# مرکز نسبت داده می‌شوند و فهرست بقیه نمونه‌ها از شاخص قبلی برداشته می‌شود (نمونه‌های هر برچسب در مدل پشت سر هم‌اند).
+# شاخص قبلی باید با مدل پیش از ترکیب هم‌خوان بوده باشد؛ مراکز فقط در آموزش کامل از نو ساخته می‌شوند
+def update_index(model_path, changed_labels, min_gallery=MIN_GALLERY):
+    start = time.perf_counter()
+    path = index_path(model_path)
+    with np.load(path) as index:
+        if "labels" not in index.files:
+            return save_index(model_path, min_gallery=min_gallery)
+        centroids, old_assignments, old_labels = index["centroids"], index["assignments"], index["labels"]
+        n_probe = int(index["n_probe"])
+    model = load_binary_model(binary_model_path(model_path))
+    labels = model["labels"]
+    if len(labels) < min_gallery:
+        os.remove(path)
+        return
+
+    ids, starts, counts = np.unique(old_labels, return_index=True, return_counts=True)
+    previous = {int(label): (first, count) for label, first, count in zip(ids, starts, counts)}
+    changed = {int(label) for label in changed_labels}
+    assignments = np.empty(len(labels), dtype=np.int32)
+    stale = np.zeros(len(labels), dtype=bool)
+    for label, first, count in zip(*np.unique(labels, return_index=True, return_counts=True)):
+        old = previous.get(int(label))
+        if int(label) in changed or old is None or old[1] != count:
+            stale[first:first + count] = True
+        else:
+            assignments[first:first + count] = old_assignments[old[0]:old[0] + count]
+    if stale.any():
+        assignments[stale] = nearest_centroids(model["histograms"][stale], centroids)
+
+    write_index(model_path, centroids, assignments, labels, n_probe, model["source_stamp"])
+    print(f"[✔] شاخص تقریبی برای {int(stale.sum())} نمونه در {(time.perf_counter() - start) * 1000:.0f}ms "
+          f"به‌روز شد: '{path}'")
+
+# جست‌وجوی تقریبی: فقط نمونه‌های n_probe فهرست نزدیک‌تر با فاصله دقیق مقایسه می‌شوند
+class IvfMatcher:
+    def __init__(self, matcher, centroids, assignments, n_probe):
+        # هر فهرست یک ماتچر جداگانه با ماتریس پیوسته خودش است
+        histograms = matcher.histograms
+        self.lists = []
+        for k in range(len(centroids)):
+            members = np.flatnonzero(assignments == k)
+            self.lists.append(LbphMatcher(histograms[members], matcher.labels[members], matcher.radius,
+                                          matcher.neighbors, matcher.grid_x, matcher.grid_y, matcher.threshold)
+                              if len(members) else None)
+        self.matcher = matcher
+        self.coarse = LbphMatcher(centroids, np.arange(len(centroids)))
+        self.n_probe = n_probe
+
+    def __len__(self):
+        return len(self.matcher)
+
+    def histogram(self, face):
+        return self.matcher.histogram(face)
+
+    def candidates(self, query):
+        lists = np.argsort(self.coarse.distances(query), kind="stable")[:self.n_probe]
+        return [self.lists[k] for k in lists if self.lists[k] is not None]
+
+    def match(self, faces, k=1):
+        results = []
+        for face in faces:
+            query = self.histogram(face)
+            candidates = self.candidates(query)
+            if not candidates:
+                # همه فهرست‌های نزدیک خالی‌اند (k-means ممکن است فهرستی را خالی بگذارد)؛ جست‌وجوی دقیق
+                results.append(self.matcher.match([face], k)[0])
+                continue
+            dist = np.concatenate([candidate.distances(query) for candidate in candidates])
+            labels = np.concatenate([candidate.labels for candidate in candidates])
+            top = np.argsort(dist, kind="stable")[:k]
+            results.append([(int(labels[i]), float(dist[i])) for i in top if dist[i] < self.matcher.threshold])
+        return results
+
+    def predict(self, face):
+        best = self.match([face], k=1)[0]
+        if not best:
+            return -1, sys.float_info.max
+        return best[0]
+
+# ماتچر تقریبی در صورت وجود شاخص به‌روز و گالری به اندازه کافی بزرگ؛ در غیر این صورت همان ماتچر دقیق.
+# بدون n_probe مقدار انتخاب‌شده هنگام ساخت شاخص استفاده می‌شود
+def load_ivf_matcher(model_path=MODEL_PATH, n_probe=None, min_gallery=MIN_GALLERY):
+    matcher = load_matcher(model_path)
+    path = index_path(model_path)
+    if not isinstance(matcher, LbphMatcher) or len(matcher) < min_gallery or not os.path.exists(path):
+        return matcher
+
+    if not index_is_current(model_path):
+        print("[!] شاخص تقریبی با مدل فعلی هم‌خوان نیست؛ جست‌وجوی دقیق استفاده می‌شود.")
+        return matcher
+    with np.load(path) as index:
+        return IvfMatcher(matcher, index["centroids"], index["assignments"], n_probe or int(index["n_probe"]))
+
+# مقایسه دقت (recall@1) و سرعت جست‌وجوی تقریبی با جست‌وجوی دقیق برای چند مقدار n_probe
+def benchmark(model_path=MODEL_PATH, probes=None):
+    import cv2
+    from training_data import load_training_data
+
+    if probes is None:
+        # تصاویر آینه‌شده داده‌ها به عنوان چهره‌های آزمایشی
+        faces, _, _ = load_training_data()
+        probes = [cv2.flip(face, 1) for face in faces]
+
+    exact = LbphMatcher.from_model(model_path)
+    if not os.path.exists(index_path(model_path)):
+        print(f"[!] شاخص تقریبی وجود ندارد (گالری کوچک‌تر از {MIN_GALLERY} نمونه)؛ با --build ساخته می‌شود.")
+        return
+    with np.load(index_path(model_path)) as index:
+        centroids, assignments, chosen = index["centroids"], index["assignments"], int(index["n_probe"])
+
+    start = time.perf_counter()
+    expected = exact.match(probes)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(probes)
+    print(f"[⏱] جست‌وجوی دقیق روی {len(exact)} نمونه: {exact_ms:.2f}ms برای هر چهره")
+
+    # توان‌های ۲ تا همه فهرست‌ها، به همراه n_probe انتخاب‌شده هنگام ساخت شاخص
+    values = sorted({min(2 ** i, len(centroids)) for i in range(int(np.log2(len(centroids))) + 2)} | {chosen})
+    for n_probe in values:
+        ivf = IvfMatcher(exact, centroids, assignments, n_probe)
+        start = time.perf_counter()
+        actual = ivf.match(probes)
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(probes)
+        hits = sum(1 for e, a in zip(expected, actual) if e and a and abs(e[0][1] - a[0][1]) < 1e-6)
+        same_label = sum(1 for e, a in zip(expected, actual) if e and a and e[0][0] == a[0][0])
+        marker = " ←" if n_probe == chosen else ""
+        print(f"   n_probe={n_probe}/{len(centroids)}{marker}: recall@1 {hits / len(probes):.3f}، "
+              f"برچسب یکسان {same_label / len(probes):.3f}، {ivf_ms:.2f}ms برای هر چهره")
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--build":
+        # ساخت اجباری حتی برای گالری کوچک، برای سنجش
+        save_index(min_gallery=0)
+    else:
+        benchmark()
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import cv2
+from concurrent.futures import ProcessPoolExecutor
+from model_manager import MODEL_PATH
+from lbph_matcher import load_matcher
+from label_index import LabelIndex
+from face_detector import load_cascade, detect_faces
+from prediction_cache import CONFIDENCE_THRESHOLD
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+IMAGES_PER_TASK = 32     # تعداد تصاویری که هر بار به یک پردازه فرستاده می‌شوند
+FRAMES_PER_TASK = 300    # طول هر تکه ویدیو برای تقسیم بین پردازه‌ها
+
+FIELDS = ["source", "frame", "x", "y", "w", "h", "label", "user_id", "user_name", "confidence", "recognized"]
+
+# هر پردازه یک بار cascade، مدل و فهرست برچسب‌ها را بارگذاری می‌کند
+worker = {}
+
+def init_worker(model_path, threshold):
+    # موازی‌سازی بین پردازه‌هاست؛ رشته‌های داخلی اوپن‌سی‌وی فقط رقابت ایجاد می‌کنند
+    cv2.setNumThreads(1)
+    worker["face_cascade"] = load_cascade()
+    worker["recognizer"] = load_matcher(model_path)
+    worker["label_index"] = LabelIndex(model_path)
+    worker["threshold"] = threshold
+
+# همان مراحل recognize_face: تشخیص با Haar Cascade و پیش‌بینی LBPH برای هر چهره
+def recognize_frame(source, frame_number, frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    rows = []
+    for (x, y, w, h) in detect_faces(worker["face_cascade"], gray):
+        label, confidence = worker["recognizer"].predict(gray[y:y + h, x:x + w])
+        entry = worker["label_index"].get(label) if label >= 0 else None
+        user_id, user_name = entry["folder"].split("_", 1) if entry is not None else ("", "")
+        rows.append({
+            "source": source,
+            "frame": frame_number,
+            "x": x, "y": y, "w": w, "h": h,
+            "label": int(label),
+            "user_id": user_id,
+            "user_name": user_name,
+            "confidence": round(float(confidence), 3),
+            "recognized": entry is not None and confidence < worker["threshold"],
+        })
+    return rows
+
+def process_images(paths):
+    rows, frames = [], 0
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"[!] تصویر خوانده نشد: {path}", file=sys.stderr)
+            continue
+        frames += 1
+        rows.extend(recognize_frame(path, 0, frame))
+    return rows, frames
+
+def process_video(path, start, count, frame_step):
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    rows, frames = [], 0
+    frame_number = start
+    while count is None or frame_number < start + count:
+        # فریم‌های رد شده فقط grab می‌شوند و رمزگشایی نمی‌شوند
+        if (frame_number - start) % frame_step:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames += 1
+            rows.extend(recognize_frame(path, frame_number, frame))
+        frame_number += 1
+    cap.release()
+    return rows, frames
+
+def run_task(task):
+    if task[0] == "images":
+        return process_images(task[1])
+    return process_video(*task[1:])
+
+def find_inputs(paths):
+    images, videos = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file in files:
+            ext = os.path.splitext(file)[1].lower()
+            if ext in IMAGE_EXTENSIONS:
+                images.append(file)
+            elif ext in VIDEO_EXTENSIONS:
+                videos.append(file)
+    return images, videos
+
+# تصاویر در دسته‌های کوچک و ویدیوها در تکه‌های FRAMES_PER_TASK فریمی بین پردازه‌ها پخش می‌شوند
+def build_tasks(images, videos, frame_step):
+    tasks = [("images", images[i:i + IMAGES_PER_TASK]) for i in range(0, len(images), IMAGES_PER_TASK)]
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total <= 0:
+            # تعداد فریم نامعلوم است؛ کل ویدیو در یک پردازه خوانده می‌شود
+            tasks.append(("video", path, 0, None, frame_step))
+            continue
+        chunk = max(frame_step, FRAMES_PER_TASK // frame_step * frame_step)
+        tasks.extend(("video", path, start, min(chunk, total - start), frame_step) for start in range(0, total, chunk))
+    return tasks
+
+class ResultWriter:
+    def __init__(self, output_path):
+        self.file = open(output_path, "w", newline="", encoding="utf-8") if output_path != "-" else sys.stdout
+        self.jsonl = output_path.lower().endswith(".jsonl")
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.jsonl:
+                self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+def batch_recognize(inputs, output_path="batch_results.csv", model_path=MODEL_PATH, workers=None,
+                    frame_step=1, threshold=CONFIDENCE_THRESHOLD):
+    if not os.path.exists(model_path):
+        print("[×] فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.", file=sys.stderr)
+        return
+
+    images, videos = find_inputs(inputs)
+    tasks = build_tasks(images, videos, frame_step)
+    if not tasks:
+        print("[!] هیچ تصویر یا ویدیویی یافت نشد.", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    writer = ResultWriter(output_path)
+    frames = faces = recognized = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(model_path, threshold)) as executor:
+            # نتایج به ترتیب ورودی و بلافاصله پس از آماده شدن هر بخش نوشته می‌شوند
+            for rows, task_frames in executor.map(run_task, tasks):
+                writer.write(rows)
+                frames += task_frames
+                faces += len(rows)
+                recognized += sum(row["recognized"] for row in rows)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"[⏱] {frames} فریم از {len(images)} تصویر و {len(videos)} ویدیو در {elapsed:.1f}s "
+          f"({frames / elapsed:.1f} فریم بر ثانیه)؛ {faces} چهره، {recognized} شناخته‌شده", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="تشخیص چهره دسته‌ای روی پوشه تصاویر و فایل‌های ویدیو")
+    parser.add_argument("inputs", nargs="+", help="پوشه‌ها، تصاویر یا فایل‌های ویدیو")
+    parser.add_argument("-o", "--output", default="batch_results.csv", help="فایل خروجی .csv یا .jsonl (- برای خروجی استاندارد)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="تعداد پردازه‌ها (پیش‌فرض: تعداد هسته‌ها)")
+    parser.add_argument("--frame-step", type=int, default=1, help="پردازش هر چند فریم ویدیو یک بار")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+    batch_recognize(args.inputs, args.output, args.model, args.workers, max(1, args.frame_step), args.threshold)
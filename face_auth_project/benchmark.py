@@ -0,0 +1,270 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from face_detector import load_cascade, detect_faces
+from model_manager import save_model, load_model
+from lbph_matcher import LbphMatcher, load_matcher
+from train_model import train_model, scan_users, sample_loader
+
+DATA_DIR = "data"
+SEED = 1234
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+FACE_COUNTS = [1, 2, 4]
+GALLERY_SIZES = [500, 2000, 8000]
+REPEAT = 20
+PROBES = 20
+
+# اجرای چندباره یک مرحله و خلاصه زمان‌ها به میلی‌ثانیه؛ اجرای اول برای گرم شدن شمرده نمی‌شود
+def measure(fn, repeat=REPEAT, warmup=1):
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples), result
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    return {
+        "n": len(samples),
+        "min_ms": round(float(samples.min()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
+
+# نمونه‌های همه کاربران از همان مسیر آموزش (پوشه داده یا مخزن فشرده)
+def load_crops(data_path=DATA_DIR):
+    users = scan_users(data_path)
+    load = sample_loader(data_path, users)
+    crops = []
+    for folder_name, samples in sorted(users.items()):
+        names = sorted(samples, key=lambda name: (len(name), name))
+        crops.extend(np.ascontiguousarray(face) for face in load(folder_name, names) if face is not None)
+    if not crops:
+        sys.exit(f"[×] هیچ تصویری در '{data_path}' یافت نشد.")
+    return crops
+
+# زمینه نرم و تصادفی (نویز کم‌وضوح بزرگ‌شده) با بذر ثابت، تا فریم‌ها در هر اجرا یکسان باشند
+def synthetic_background(rng, width, height):
+    noise = rng.integers(40, 200, size=(height // 16 + 1, width // 16 + 1), dtype=np.uint8)
+    return cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+
+# برش‌های داده‌ها دقیقاً روی چهره‌اند؛ کمی حاشیه برای Haar Cascade لازم است
+def padded(crop, margin=0.25):
+    border = int(crop.shape[0] * margin)
+    return cv2.copyMakeBorder(crop, border, border, border, border, cv2.BORDER_REPLICATE)
+
+# فقط برش‌هایی که Haar Cascade در آن‌ها چهره پیدا می‌کند، تا مراحل پیش‌بینی همیشه سنجیده شوند
+def detectable_crops(face_cascade, crops):
+    found = [crop for crop in crops if detect_faces(face_cascade, cv2.resize(padded(crop), (240, 240)))]
+    return found or crops
+
+# قرار دادن چهره‌های داده‌ها روی زمینه، هر چهره در یک خانه جداگانه از شبکه
+def synthetic_frame(rng, crops, width, height, face_count):
+    frame = synthetic_background(rng, width, height)
+    cols = int(np.ceil(np.sqrt(face_count)))
+    rows = int(np.ceil(face_count / cols))
+    cell_w, cell_h = width // cols, height // rows
+    size = int(min(cell_w, cell_h) * 0.7)
+    for i in range(face_count):
+        crop = cv2.resize(padded(crops[rng.integers(len(crops))]), (size, size), interpolation=cv2.INTER_LINEAR)
+        x = (i % cols) * cell_w + int(rng.integers(0, cell_w - size + 1))
+        y = (i // cols) * cell_h + int(rng.integers(0, cell_h - size + 1))
+        frame[y:y + size, x:x + size] = crop
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+# نمونه‌های مصنوعی برای گالری بزرگ: چهره‌های داده‌ها با جابه‌جایی، چرخش و نویز کوچک
+def synthetic_gallery(rng, crops, count, users):
+    faces, labels = [], []
+    for i in range(count):
+        crop = crops[rng.integers(len(crops))]
+        h, w = crop.shape
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), float(rng.uniform(-8, 8)), float(rng.uniform(0.95, 1.05)))
+        matrix[:, 2] += rng.uniform(-3, 3, size=2)
+        face = cv2.warpAffine(crop, matrix, (w, h), borderMode=cv2.BORDER_REFLECT)
+        face = cv2.add(face, rng.integers(0, 12, size=face.shape, dtype=np.uint8))
+        faces.append(face)
+        labels.append(i % users)
+    return faces, np.array(labels)
+
+# همان مسیر display_frame در رابط گرافیکی: کوچک‌سازی و تبدیل رنگ در بافرهای ثابت، سپس paste در یک PhotoImage
+class DisplayPath:
+    def __init__(self, size=(320, 240)):
+        width, height = size
+        self.size = size
+        self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgba = np.empty((height, width, 4), dtype=np.uint8)
+        self.image = Image.frombuffer("RGBA", size, self.rgba, "raw", "RGBA", 0, 1)
+        self.root, self.photo = None, None
+        try:
+            import tkinter as tk
+            from PIL import ImageTk
+            self.root = tk.Tk()
+            self.root.withdraw()
+            self.photo = ImageTk.PhotoImage("RGBA", size)
+        except Exception:
+            # بدون نمایشگر فقط تبدیل‌های OpenCV سنجیده می‌شوند
+            self.root = None
+
+    def convert(self, frame):
+        cv2.resize(frame, self.size, dst=self.bgr, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+        if self.photo is not None:
+            self.photo.paste(self.image)
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+
+def benchmark_frames(crops, recognizer, matcher, resolutions, face_counts, repeat):
+    rng = np.random.default_rng(SEED)
+    face_cascade = load_cascade()
+    crops = detectable_crops(face_cascade, crops)
+    display = DisplayPath()
+    results = []
+    for width, height in resolutions:
+        for face_count in face_counts:
+            frame = synthetic_frame(rng, crops, width, height, face_count)
+            encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1]
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            stages = {}
+            stages["decode"], _ = measure(lambda: cv2.imdecode(encoded, cv2.IMREAD_COLOR), repeat)
+            stages["cvt_color"], _ = measure(lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), repeat)
+            stages["detect"], boxes = measure(lambda: detect_faces(face_cascade, gray), repeat)
+            faces = [gray[y:y + h, x:x + w] for (x, y, w, h) in boxes]
+            if faces:
+                stages["predict_opencv"], _ = measure(lambda: [recognizer.predict(face) for face in faces], repeat)
+                stages["predict_matcher"], _ = measure(lambda: matcher.match(faces), repeat)
+            stages["display_conversion"], _ = measure(lambda: display.convert(frame), repeat)
+            results.append({
+                "resolution": [width, height],
+                "faces": face_count,
+                "detected": len(boxes),
+                "display_photo_image": display.photo is not None,
+                "stages": stages,
+            })
+            print(f"   {width}x{height} با {face_count} چهره: " +
+                  "، ".join(f"{name} {stats['p50_ms']}ms" for name, stats in stages.items()))
+    display.close()
+    return results
+
+# آموزش کامل با train_model و بارگذاری مدل، روی داده‌های واقعی پوشه data؛ مدل و حافظه نهان در پوشه موقت
+def benchmark_training(data_path, tmp_dir, repeat):
+    model_path = os.path.join(tmp_dir, "model.yml")
+    cache_dir = os.path.join(tmp_dir, "data_cache")
+    with contextlib.redirect_stdout(io.StringIO()):
+        train, _ = measure(lambda: train_model(data_path, model_path, cache_dir=cache_dir), max(1, repeat // 4))
+    load_opencv, _ = measure(lambda: load_model(model_path), repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_binary, _ = measure(lambda: load_matcher(model_path), repeat)
+    print(f"   train_model {train['p50_ms']}ms، بارگذاری YAML {load_opencv['p50_ms']}ms، "
+          f"بارگذاری باینری {load_binary['p50_ms']}ms")
+    return {"train_model": train, "load_model": load_opencv, "load_matcher": load_binary}
+
+# رشد زمان آموزش، ذخیره، بارگذاری و پیش‌بینی با بزرگ شدن گالری
+def benchmark_galleries(crops, sizes, tmp_dir, repeat):
+    rng = np.random.default_rng(SEED)
+    probes, _ = synthetic_gallery(rng, crops, PROBES, 1)
+    results = []
+    for size in sizes:
+        faces, labels = synthetic_gallery(rng, crops, size, max(1, size // 20))
+        model_path = os.path.join(tmp_dir, f"gallery_{size}.yml")
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+
+        start = time.perf_counter()
+        recognizer.train(faces, labels)
+        train_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        save_model(recognizer, model_path)
+        save_ms = (time.perf_counter() - start) * 1000
+        load_opencv, _ = measure(lambda: load_model(model_path), max(1, repeat // 4))
+        load_binary, matcher = measure(lambda: load_matcher(model_path), max(1, repeat // 4))
+        predict_opencv, _ = measure(lambda: [recognizer.predict(face) for face in probes], 1)
+        predict_matcher, _ = measure(lambda: matcher.match(probes), 1)
+
+        results.append({
+            "gallery": size,
+            "train_ms": round(train_ms, 3),
+            "save_ms": round(save_ms, 3),
+            "model_bytes": os.path.getsize(model_path),
+            "load_model": load_opencv,
+            "load_matcher": load_binary,
+            "predict_opencv_per_face_ms": round(predict_opencv["p50_ms"] / len(probes), 3),
+            "predict_matcher_per_face_ms": round(predict_matcher["p50_ms"] / len(probes), 3),
+        })
+        print(f"   گالری {size}: آموزش {train_ms:.0f}ms، ذخیره {save_ms:.0f}ms، بارگذاری YAML {load_opencv['p50_ms']}ms، "
+              f"پیش‌بینی {results[-1]['predict_opencv_per_face_ms']}ms (ماتچر {results[-1]['predict_matcher_per_face_ms']}ms) برای هر چهره")
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+def run_benchmarks(data_path=DATA_DIR, output_path="benchmark_results.json", resolutions=RESOLUTIONS,
+                   face_counts=FACE_COUNTS, gallery_sizes=GALLERY_SIZES, repeat=REPEAT):
+    crops = load_crops(data_path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print("[⏱] آموزش و بارگذاری مدل")
+        training = benchmark_training(data_path, tmp_dir, repeat)
+
+        model_path = os.path.join(tmp_dir, "model.yml")
+        recognizer = load_model(model_path)
+        matcher = LbphMatcher.from_model(model_path)
+        print("[⏱] مراحل پردازش فریم‌های مصنوعی")
+        frames = benchmark_frames(crops, recognizer, matcher, resolutions, face_counts, repeat)
+
+        print("[⏱] گالری‌های مصنوعی بزرگ")
+        galleries = benchmark_galleries(crops, gallery_sizes, tmp_dir, repeat)
+
+    results = {
+        "config": {
+            "seed": SEED,
+            "repeat": repeat,
+            "crops": len(crops),
+            "resolutions": [list(r) for r in resolutions],
+            "face_counts": list(face_counts),
+            "gallery_sizes": list(gallery_sizes),
+        },
+        "environment": environment(),
+        "training": training,
+        "frames": frames,
+        "galleries": galleries,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"[✔] نتایج در '{output_path}' ذخیره شد.")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش سرعت مراحل تشخیص و شناسایی چهره بدون دوربین")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--galleries", default=",".join(map(str, GALLERY_SIZES)),
+                        help="اندازه گالری‌های مصنوعی، جداشده با ویرگول")
+    parser.add_argument("--quick", action="store_true", help="یک وضوح، یک چهره و گالری‌های کوچک")
+    args = parser.parse_args()
+
+    if args.quick:
+        run_benchmarks(args.data, args.output, [(640, 480)], [1], [250, 1000], max(1, args.repeat // 4))
+    else:
+        gallery_sizes = [int(size) for size in args.galleries.split(",") if size]
+        run_benchmarks(args.data, args.output, repeat=args.repeat, gallery_sizes=gallery_sizes)
@@ -0,0 +1,181 @@
+import argparse
+import os
+import queue
+import sys
+import time
+import cv2
+import numpy as np
+import multiprocessing as mp
+from datetime import datetime
+from multiprocessing import shared_memory
+from model_manager import MODEL_PATH
+from lbph_matcher import LbphMatcher
+from label_index import LabelIndex
+from frame_grabber import open_source
+from face_detector import load_cascade, DetectionScheduler
+from prediction_cache import PredictionCache
+from access_log import log_access
+
+CAMERA_TIMEOUT = 10
+REPORT_INTERVAL = 5.0    # فاصله گزارش آمار هر دوربین (ثانیه)
+EVENT_COOLDOWN = 10.0    # حداقل فاصله ثبت دوباره ورود یک کاربر از یک دوربین (ثانیه)
+
+# هیستوگرام‌های مدل یک بار در حافظه مشترک قرار می‌گیرند؛ پردازه‌های دوربین فقط آن را می‌خوانند
+class SharedModel:
+    def __init__(self, model_path=MODEL_PATH):
+        matcher = LbphMatcher.from_model(model_path)
+        histograms_t = matcher.histograms_t
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, histograms_t.nbytes))
+        np.ndarray(histograms_t.shape, dtype=np.float32, buffer=self.shm.buf)[:] = histograms_t
+        self.spec = {
+            "model_path": model_path,
+            "name": self.shm.name,
+            "shape": histograms_t.shape,
+            "labels": matcher.labels,
+            "params": (matcher.radius, matcher.neighbors, matcher.grid_x, matcher.grid_y, matcher.threshold),
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# ساخت ماتچر روی همان حافظه مشترک، بدون کپی هیستوگرام‌ها
+def attach_matcher(spec):
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    histograms_t = np.ndarray(spec["shape"], dtype=np.float32, buffer=shm.buf)
+    return shm, LbphMatcher(histograms_t.T, spec["labels"], *spec["params"])
+
+# یک پردازه برای هر دوربین: دریافت تصویر، تشخیص و شناسایی؛ رویدادها از طریق صف به پردازه اصلی می‌رسند
+def camera_worker(camera, source, model_spec, events, stop, report_interval=REPORT_INTERVAL):
+    # موازی‌سازی بین دوربین‌هاست؛ رشته‌های داخلی اوپن‌سی‌وی فقط رقابت ایجاد می‌کنند
+    cv2.setNumThreads(1)
+    shm, matcher = attach_matcher(model_spec)
+    label_index = LabelIndex(model_spec["model_path"])
+    detector = DetectionScheduler(load_cascade())
+    predictions = PredictionCache(matcher)
+    cap = open_source(source).start()
+
+    last_logged = {}
+    frames = busy = 0
+    busy_ms = 0.0
+    last_report = time.monotonic()
+    stalled_reported = False
+    try:
+        while not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if cap.stalled(CAMERA_TIMEOUT) and not stalled_reported:
+                    events.put(("error", camera, f"فریمی از '{source}' دریافت نمی‌شود"))
+                    stalled_reported = True
+                time.sleep(0.005)
+                continue
+            stalled_reported = False
+
+            start = time.perf_counter()
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = detector.update(gray)
+            predictions.prune([track_id for track_id, _ in faces])
+            for track_id, box in faces:
+                predictions.lookup(track_id, box, gray)
+                label = predictions.accepted_label(track_id)
+                entry = label_index.get(label) if label is not None else None
+                if entry is None:
+                    continue
+                user_id, user_name = entry["folder"].split("_", 1)
+                now = time.monotonic()
+                if now - last_logged.get(user_id, -EVENT_COOLDOWN) >= EVENT_COOLDOWN:
+                    last_logged[user_id] = now
+                    events.put(("access", camera, user_id, user_name, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            frames += 1
+            busy += 1
+            busy_ms += (time.perf_counter() - start) * 1000
+
+            now = time.monotonic()
+            if now - last_report >= report_interval:
+                grabber = cap.stats()
+                events.put(("stats", camera, {
+                    "fps": busy / (now - last_report),
+                    "busy_ms": busy_ms / busy if busy else 0.0,
+                    "frames": frames,
+                    "dropped": grabber["frames_dropped"],
+                    "reconnects": grabber["reconnects"],
+                    "predict_calls": predictions.predict_calls,
+                }))
+                busy, busy_ms, last_report = 0, 0.0, now
+    finally:
+        cap.release()
+        del matcher
+        shm.close()
+
+def handle_event(event, stats):
+    kind, camera = event[0], event[1]
+    if kind == "access":
+        _, _, user_id, user_name, when = event
+        log_access(user_id, user_name, camera=camera, time=when)
+        print(f"[✔ {camera}] ورود {user_name} (ID: {user_id}) در {when}")
+    elif kind == "stats":
+        stats[camera] = event[2]
+        s = event[2]
+        print(f"[📷 {camera}] {s['fps']:.1f} فریم بر ثانیه، {s['busy_ms']:.1f}ms برای هر فریم، "
+              f"دورریخته {s['dropped']}، اتصال دوباره {s['reconnects']}")
+    else:
+        print(f"[× {camera}] {event[2]}")
+
+def run_service(sources, duration=None, model_path=MODEL_PATH, report_interval=REPORT_INTERVAL):
+    if not os.path.exists(model_path):
+        sys.exit("[×] فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.")
+
+    shared = SharedModel(model_path)
+    events = mp.Queue()
+    stop = mp.Event()
+    cameras = {f"cam{i}": source for i, source in enumerate(sources)}
+    workers = [mp.Process(target=camera_worker, args=(camera, source, shared.spec, events, stop, report_interval),
+                          name=camera, daemon=True)
+               for camera, source in cameras.items()]
+    for worker in workers:
+        worker.start()
+    print(f"[🔍] سرویس با {len(workers)} دوربین شروع شد: " +
+          "، ".join(f"{camera}={source}" for camera, source in cameras.items()))
+
+    stats = {}
+    deadline = time.monotonic() + duration if duration else None
+    try:
+        while any(worker.is_alive() for worker in workers):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            try:
+                handle_event(events.get(timeout=0.5), stats)
+            except queue.Empty:
+                pass
+    except KeyboardInterrupt:
+        print("[!] توقف سرویس...")
+    finally:
+        stop.set()
+        # صف باید پیش از join خالی شود، وگرنه پردازه‌ای که هنوز در صف می‌نویسد تمام نمی‌شود
+        while any(worker.is_alive() for worker in workers):
+            try:
+                handle_event(events.get(timeout=0.1), stats)
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                handle_event(events.get_nowait(), stats)
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.join()
+        shared.close()
+
+    if stats:
+        total = sum(s["fps"] for s in stats.values())
+        print(f"[⏱] مجموع {total:.1f} فریم بر ثانیه روی {len(stats)} دوربین "
+              f"({os.cpu_count()} هسته در دسترس)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سرویس تشخیص چهره بدون رابط گرافیکی برای چند دوربین")
+    parser.add_argument("sources", nargs="+", help="آدرس دوربین‌های IP، شماره وب‌کم یا فایل ویدیو")
+    parser.add_argument("--duration", type=float, default=None, help="مدت اجرا (ثانیه)؛ پیش‌فرض تا Ctrl+C")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL)
+    args = parser.parse_args()
+    run_service(args.sources, args.duration, args.model, args.report_interval)
@@ -1,9 +1,19 @@
 import cv2
 import os
 import sys
+import time
+from frame_grabber import FrameGrabber
+from enrollment_writer import EnrollmentWriter
+import packed_store
+
+# حداکثر زمان بدون دریافت فریم (ثانیه) پیش از اعلام خطای دوربین
+CAMERA_TIMEOUT = 10
 
 def create_user_folder(user_id, user_name):
     folder_path = f"data/{user_id}_{user_name}"
+    # پس از مهاجرت به مخزن فشرده، نمونه‌ها در فایل کاربر ذخیره می‌شوند و پوشه‌ای لازم نیست
+    if packed_store.enabled():
+        return folder_path
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
         print(f"[✔] پوشه کاربر ایجاد شد: {folder_path}")
@@ -16,36 +26,40 @@ def capture_faces(user_id, user_name, num_samples=20, ip_stream_url="http://192.
 
     print(f"[🔍] در حال اتصال به دوربین IP: {ip_stream_url}")
 
-    # اتصال به دوربین IP
-    cap = cv2.VideoCapture(ip_stream_url)
-    if not cap.isOpened():
-        print("[×] خطا: نمی‌توان به دوربین IP متصل شد! لطفاً آدرس IP، پورت یا اتصال شبکه را بررسی کنید.")
-        return
-
     # بارگذاری مدل تشخیص چهره
     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
     if face_cascade.empty():
         print("[×] خطا: فایل Haar Cascade بارگذاری نشد!")
         return
 
-    sample_count = 0
+    # اتصال به دوربین IP در رشته جداگانه
+    cap = FrameGrabber(ip_stream_url).start()
+
+    # نمونه‌ها در پس‌زمینه هم‌اندازه، بررسی و ذخیره می‌شوند
+    writer = EnrollmentWriter(folder_path, max_samples=num_samples)
 
     while True:
         ret, frame = cap.read()
         if not ret:
-            print("[×] خواندن تصویر از دوربین با خطا مواجه شد.")
-            break
+            if cap.stalled(CAMERA_TIMEOUT):
+                if cap.frames_read == 0:
+                    print("[×] خطا: نمی‌توان به دوربین IP متصل شد! لطفاً آدرس IP، پورت یا اتصال شبکه را بررسی کنید.")
+                else:
+                    print("[×] خواندن تصویر از دوربین با خطا مواجه شد.")
+                break
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("[!] خروج با کلید Q.")
+                break
+            time.sleep(0.005)
+            continue
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
 
         for (x, y, w, h) in faces:
-            sample_count += 1
-            face_img = gray[y:y + h, x:x + w]
-            img_path = os.path.join(folder_path, f"{sample_count}.jpg")
-            cv2.imwrite(img_path, face_img)
+            writer.submit(gray[y:y + h, x:x + w])
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv2.putText(frame, f"Sample {sample_count}/{num_samples}", (10, 30),
+            cv2.putText(frame, writer.status(), (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
         cv2.imshow("Capturing Faces", frame)
@@ -53,11 +67,12 @@ def capture_faces(user_id, user_name, num_samples=20, ip_stream_url="http://192.
         if cv2.waitKey(1) & 0xFF == ord('q'):
             print("[!] خروج با کلید Q.")
             break
-        elif sample_count >= num_samples:
+        elif writer.accepted >= num_samples:
             print("[✔] گرفتن تصاویر تکمیل شد.")
             break
 
     cap.release()
+    writer.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
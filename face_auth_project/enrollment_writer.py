@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import cv2
+import numpy as np
+import packed_store
+
+FACE_SIZE = (100, 100)     # اندازه ثابت نمونه‌های ذخیره‌شده
+MIN_SHARPNESS = 40.0       # حداقل واریانس لاپلاسین؛ نمونه‌های تارتر ذخیره نمی‌شوند
+MIN_HASH_DISTANCE = 4      # حداقل فاصله همینگ dHash با نمونه‌های قبلی؛ نزدیک‌ترها تکراری‌اند
+QUEUE_SIZE = 32            # اگر نوشتن عقب بماند، نمونه‌های تازه دور ریخته می‌شوند نه اینکه دوربین منتظر بماند
+RELAX_AFTER = 30           # پس از این تعداد رد پیاپی، معیار وضوح نصف و فاصله هش یکی کم می‌شود تا ثبت‌نام گیر نکند
+
+# هش ادراکی ۶۴ بیتی: مقایسه هر پیکسل با همسایه راستش در تصویر ۹×۸
+def dhash(face):
+    small = cv2.resize(face, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def sharpness(face):
+    return float(cv2.Laplacian(face, cv2.CV_64F).var())
+
+# ذخیره نمونه‌های ثبت‌نام در رشته پس‌زمینه؛ نمونه‌ها هم‌اندازه می‌شوند و تکراری یا تار ذخیره نمی‌شوند
+class EnrollmentWriter:
+    def __init__(self, folder_path, max_samples=None, face_size=FACE_SIZE, min_sharpness=MIN_SHARPNESS,
+                 min_hash_distance=MIN_HASH_DISTANCE, packed_dir=packed_store.PACKED_DIR):
+        self.folder_path = folder_path
+        # پس از مهاجرت به مخزن فشرده، نمونه‌ها به جای فایل‌های JPEG به انتهای فایل کاربر اضافه می‌شوند
+        self.packed_dir = packed_dir if packed_store.enabled(packed_dir) else None
+        self.packed_faces = []
+        self.max_samples = max_samples
+        self.face_size = face_size
+        self.min_sharpness = min_sharpness
+        self.min_hash_distance = min_hash_distance
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.hashes = []
+        self.next_index = 1
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.blurry = 0
+        self.dropped = 0
+        self.rejected_in_row = 0
+        self.relaxed = 0
+        self.thread = threading.Thread(target=self._run, name="EnrollmentWriter", daemon=True)
+        self.thread.start()
+
+    # بدون انتظار؛ برش چهره کپی می‌شود تا فریم دوربین نگه داشته نشود
+    def submit(self, face):
+        try:
+            self.queue.put_nowait(face.copy())
+        except queue.Full:
+            self.dropped += 1
+
+    # وضعیت کوتاه برای نمایش روی فریم (cv2.putText فقط متن لاتین را نشان می‌دهد)
+    def status(self):
+        text = f"Sample {self.accepted}/{self.max_samples}" if self.max_samples else f"Sample {self.accepted}"
+        if self.relaxed:
+            text += f" (relaxed x{self.relaxed})"
+        return text
+
+    # نمونه‌های قبلی کاربر هم در بررسی تکرار شمرده می‌شوند و شماره‌گذاری پس از آن‌ها ادامه می‌یابد
+    def load_existing(self):
+        if self.packed_dir is not None:
+            for existing in packed_store.read_user(os.path.basename(self.folder_path), self.packed_dir):
+                self.hashes.append(dhash(existing))
+            return
+        for name in os.listdir(self.folder_path):
+            stem, ext = os.path.splitext(name)
+            if not stem.isdigit():
+                continue
+            self.next_index = max(self.next_index, int(stem) + 1)
+            existing = cv2.imread(os.path.join(self.folder_path, name), cv2.IMREAD_GRAYSCALE)
+            if existing is not None:
+                self.hashes.append(dhash(cv2.resize(existing, self.face_size, interpolation=cv2.INTER_AREA)))
+
+    # با رد پیاپی نمونه‌ها (کاربر بی‌حرکت یا دوربین تار) معیارها آسان‌تر می‌شوند؛ پس از چند مرحله هر نمونه پذیرفته می‌شود
+    def reject(self):
+        self.rejected_in_row += 1
+        if self.rejected_in_row < RELAX_AFTER:
+            return
+        self.rejected_in_row = 0
+        self.relaxed += 1
+        self.min_sharpness /= 2
+        self.min_hash_distance = max(0, self.min_hash_distance - 1)
+        print(f"[!] {RELAX_AFTER} نمونه پشت سر هم رد شد؛ معیارها آسان‌تر شد (وضوح {self.min_sharpness:.1f}، "
+              f"فاصله هش {self.min_hash_distance}).")
+
+    def _run(self):
+        self.load_existing()
+        while True:
+            face = self.queue.get()
+            if face is None:
+                return
+            if self.max_samples is not None and self.accepted >= self.max_samples:
+                continue
+            face = cv2.resize(face, self.face_size, interpolation=cv2.INTER_AREA)
+            if sharpness(face) < self.min_sharpness:
+                self.blurry += 1
+                self.reject()
+                continue
+            face_hash = dhash(face)
+            if any(hamming(face_hash, seen) < self.min_hash_distance for seen in self.hashes):
+                self.duplicates += 1
+                self.reject()
+                continue
+
+            if self.packed_dir is not None:
+                self.packed_faces.append(face)
+            else:
+                cv2.imwrite(os.path.join(self.folder_path, f"{self.next_index}.jpg"), face)
+            self.hashes.append(face_hash)
+            self.next_index += 1
+            self.accepted += 1
+            self.rejected_in_row = 0
+
+    # صبر برای نوشتن نمونه‌های باقی‌مانده
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.packed_faces:
+            packed_store.append_user(os.path.basename(self.folder_path), self.packed_faces, self.packed_dir)
+            self.packed_faces = []
+        print(f"[✔] ثبت‌نام: {self.accepted} نمونه ذخیره شد؛ {self.duplicates} تکراری، {self.blurry} تار "
+              f"و {self.dropped} نمونه به دلیل پر بودن صف کنار گذاشته شد.")
+        if self.relaxed:
+            print(f"[!] معیارهای وضوح و تکرار {self.relaxed} بار آسان‌تر شد.")
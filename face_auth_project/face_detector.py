@@ -0,0 +1,161 @@
+import cv2
+import time
+
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+# تنظیمات پیش‌فرض زمان‌بندی تشخیص
+DETECT_INTERVAL = 5        # هر چند فریم یک بار تشخیص کامل اجرا شود
+DETECT_DOWNSCALE = 0.5     # ضریب کوچک‌سازی فریم پیش از اجرای Haar Cascade
+MIN_FACE_SIZE = (60, 60)   # کوچک‌ترین چهره (وضوح اصلی) در تشخیص زمان‌بندی‌شده رابط کاربری؛ detect_faces پیش‌فرض ندارد
+TRACK_THRESHOLD = 0.6      # حداقل امتیاز تطبیق الگو برای ادامه ردیابی
+TEMPLATE_WIDTH = 32        # عرض الگوی کوچک‌شده برای ردیابی ارزان
+
+def load_cascade():
+    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    if face_cascade.empty():
+        print("[×] خطا: فایل Haar Cascade بارگذاری نشد!")
+    return face_cascade
+
+# اجرای Haar Cascade روی فریم کوچک‌شده و برگرداندن کادرها در مختصات فریم اصلی؛
+# مثل قبل بدون min_size هیچ چهره کوچکی کنار گذاشته نمی‌شود
+def detect_faces(face_cascade, gray, scale_factor=1.3, min_neighbors=5, min_size=None, downscale=1.0):
+    if downscale < 1.0:
+        small = cv2.resize(gray, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+        downscale = 1.0
+
+    if min_size is None:
+        faces = face_cascade.detectMultiScale(small, scaleFactor=scale_factor, minNeighbors=min_neighbors)
+    else:
+        small_min_size = (max(1, int(min_size[0] * downscale)), max(1, int(min_size[1] * downscale)))
+        faces = face_cascade.detectMultiScale(small, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+                                              minSize=small_min_size)
+    return [(int(x / downscale), int(y / downscale), int(w / downscale), int(h / downscale))
+            for (x, y, w, h) in faces]
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+# تشخیص کامل هر چند فریم یک بار و ردیابی ارزان چهره‌ها در فاصله بین تشخیص‌ها
+class DetectionScheduler:
+    def __init__(self, face_cascade, detect_interval=DETECT_INTERVAL, downscale=DETECT_DOWNSCALE,
+                 min_size=MIN_FACE_SIZE, scale_factor=1.3, min_neighbors=5, track_threshold=TRACK_THRESHOLD):
+        self.face_cascade = face_cascade
+        self.detect_interval = detect_interval
+        self.downscale = downscale
+        self.min_size = min_size
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.track_threshold = track_threshold
+
+        self.tracks = []
+        self.next_track_id = 1
+        self.frames_since_detect = 0
+        self.detected = False
+
+        # آمار زمانی
+        self.frames = 0
+        self.detections = 0
+        self.total_ms = 0.0
+        self.baseline_ms = None
+
+    def detect(self, gray):
+        return detect_faces(self.face_cascade, gray, self.scale_factor, self.min_neighbors,
+                            self.min_size, self.downscale)
+
+    # خروجی: فهرست (شناسه ردیاب، کادر) برای هر چهره در این فریم
+    def update(self, gray):
+        if self.baseline_ms is None:
+            # یک تشخیص در وضوح کامل برای سنجش صرفه‌جویی زمانی
+            start = time.perf_counter()
+            self.face_cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors)
+            self.baseline_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        self.detected = False
+        if not self.tracks or self.frames_since_detect >= self.detect_interval - 1:
+            self._run_detection(gray)
+        else:
+            self.frames_since_detect += 1
+            if not self._track(gray):
+                self._run_detection(gray)
+
+        self.frames += 1
+        self.total_ms += (time.perf_counter() - start) * 1000
+        return [(track["id"], track["box"]) for track in self.tracks]
+
+    def _run_detection(self, gray):
+        boxes = self.detect(gray)
+        tracks = []
+        for box in boxes:
+            # شناسه ردیاب قبلی با بیشترین همپوشانی حفظ می‌شود
+            best, best_iou = None, 0.3
+            for track in self.tracks:
+                iou = box_iou(box, track["box"])
+                if iou > best_iou:
+                    best, best_iou = track, iou
+            if best is not None:
+                self.tracks.remove(best)
+                track_id = best["id"]
+            else:
+                track_id = self.next_track_id
+                self.next_track_id += 1
+            tracks.append({"id": track_id, "box": box, "template": self._template(gray, box)})
+
+        self.tracks = tracks
+        self.frames_since_detect = 0
+        self.detections += 1
+        self.detected = True
+
+    def _template(self, gray, box):
+        x, y, w, h = box
+        scale = min(1.0, TEMPLATE_WIDTH / w)
+        template = cv2.resize(gray[y:y + h, x:x + w], None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return template, scale
+
+    # ردیابی با تطبیق الگو فقط در ناحیه اطراف آخرین کادر؛ اگر اطمینان پایین بیاید False برمی‌گردد
+    def _track(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        for track in self.tracks:
+            x, y, w, h = track["box"]
+            template, scale = track["template"]
+            margin_x, margin_y = w // 2, h // 2
+            x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+            x1, y1 = min(frame_w, x + w + margin_x), min(frame_h, y + h + margin_y)
+            roi = cv2.resize(gray[y0:y1, x0:x1], None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            if roi.shape[0] < template.shape[0] or roi.shape[1] < template.shape[1]:
+                return False
+
+            result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (best_x, best_y) = cv2.minMaxLoc(result)
+            if score < self.track_threshold:
+                return False
+
+            new_x = min(max(0, x0 + int(best_x / scale)), frame_w - w)
+            new_y = min(max(0, y0 + int(best_y / scale)), frame_h - h)
+            track["box"] = (new_x, new_y, w, h)
+        return True
+
+    def stats(self):
+        avg_ms = self.total_ms / self.frames if self.frames else 0.0
+        baseline_ms = self.baseline_ms or 0.0
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "avg_ms": round(avg_ms, 2),
+            "baseline_ms": round(baseline_ms, 2),
+            "saved_ms": round(baseline_ms - avg_ms, 2),
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"[⏱] تشخیص چهره: {stats['detections']} تشخیص کامل در {stats['frames']} فریم، "
+              f"میانگین {stats['avg_ms']}ms به ازای هر فریم (بدون زمان‌بندی {stats['baseline_ms']}ms، "
+              f"صرفه‌جویی {stats['saved_ms']}ms)")
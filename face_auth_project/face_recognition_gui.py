@@ -2,27 +2,101 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
 import cv2
 import os
+import time
 import shutil
-import csv
-import subprocess
-from datetime import datetime
+import threading
 from PIL import Image, ImageTk
 import numpy as np
+from model_manager import ModelManager
+from lbph_matcher import load_matcher
+from ann_index import load_ivf_matcher
+from label_index import LabelIndex
+from access_log import log_access, query_logs, start_writer, LEGACY_CSV_PATH
+from frame_grabber import FrameGrabber
+from face_detector import load_cascade, detect_faces, DetectionScheduler
+from prediction_cache import PredictionCache
+from training_worker import BackgroundTrainer
+import packed_store
+from enrollment_writer import EnrollmentWriter
+from metrics import Metrics
+from warmup import Warmup
 
 # مسیرهای اصلی پروژه
 DATA_DIR = "data"
 MODEL_PATH = "trained_model.yml"
-LOG_PATH = "access_log.csv"
-
-# تنظیمات اولیه OpenCV
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-if face_cascade.empty():
-    print("[×] خطا: فایل Haar Cascade بارگذاری نشد!")
-recognizer = cv2.face.LBPHFaceRecognizer_create()
+LOG_PATH = "access_log.db"
+LOG_PAGE_SIZE = 200
+
+# جست‌وجوی تقریبی در گالری‌های بزرگ (شاخص ann_index به جای مقایسه با همه نمونه‌ها)
+USE_ANN_INDEX = False
+
+# حداکثر زمان بدون دریافت فریم (ثانیه) پیش از اعلام خطای دوربین
+CAMERA_TIMEOUT = 10
+
+# فاصله بررسی پیشرفت آموزش پس‌زمینه (میلی‌ثانیه)
+TRAINING_POLL_INTERVAL = 200
+
+# نمایش نرخ فریم و زمان مراحل روی تصویر (با کلید F2 هم روشن و خاموش می‌شود)
+SHOW_METRICS_OVERLAY = False
+OVERLAY_INTERVAL = 0.5     # فاصله به‌روزرسانی متن روی تصویر (ثانیه)
+
+# نمایش تصویر دوربین مستقل از سرعت پردازش، با حداکثر DISPLAY_FPS فریم در ثانیه
+DISPLAY_SIZE = (320, 240)
+DISPLAY_FPS = 15
+
+# دوربین پیش‌فرض که در آماده‌سازی پس‌زمینه باز می‌شود (وب‌کم)
+WARMUP_CAMERA = 0
+WARMUP_POLL_INTERVAL = 100   # فاصله بررسی آماده‌سازی و درخواست‌های منتظر آن (میلی‌ثانیه)
+
+# منابع اوپن‌سی‌وی هنگام import ساخته نمی‌شوند؛ پنجره فوراً نمایش داده می‌شود و
+# Cascade، مدل و فهرست برچسب‌ها در آماده‌سازی پس‌زمینه (یا با اولین استفاده) بارگذاری می‌شوند
+cascade_lock = threading.RLock()
+face_cascade = None
+label_index = LabelIndex(MODEL_PATH)
+model_manager = ModelManager(MODEL_PATH, loader=load_ivf_matcher if USE_ANN_INDEX else load_matcher)
+trainer = BackgroundTrainer(model_manager)
+
+def get_cascade():
+    global face_cascade
+    with cascade_lock:
+        if face_cascade is None:
+            face_cascade = load_cascade()
+        return face_cascade
+
+def warm_model():
+    if os.path.exists(MODEL_PATH):
+        model_manager.get()
+
+# یک تشخیص و پیش‌بینی آزمایشی روی اولین فریم دوربین (یا تصویر سیاه) تا اولین ورود هزینه اجرای اول را نپردازد
+def warm_probe(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame is not None else np.zeros((480, 640), np.uint8)
+    with cascade_lock:
+        detect_faces(get_cascade(), gray)
+    if os.path.exists(MODEL_PATH):
+        model_manager.get().predict(cv2.resize(gray, (100, 100)))
+
+def start_warmup():
+    steps = [("cascade", get_cascade), ("model", warm_model), ("labels", label_index.preload)]
+    return Warmup(steps, camera_source=WARMUP_CAMERA, probe=warm_probe).start()
+
+# دوربین آماده‌شده در پس‌زمینه اگر همان منبع باشد، وگرنه اتصال تازه
+def open_camera(app, source):
+    return app.warmup.take_camera(source) or FrameGrabber(source).start()
+
+# تا پایان آماده‌سازی، درخواست کاربر بدون مسدود کردن رابط کاربری دوباره زمان‌بندی می‌شود
+def wait_for_warmup(app, retry):
+    if app.warmup is not None and app.warmup.ready():
+        return False
+    app.status.config(text="⏳ در حال آماده‌سازی دوربین و مدل...")
+    app.root.after(WARMUP_POLL_INTERVAL, retry)
+    return True
 
 # ایجاد پوشه کاربر
 def create_user_folder(user_id, user_name):
     folder_path = f"{DATA_DIR}/{user_id}_{user_name}"
+    # پس از مهاجرت به مخزن فشرده، نمونه‌ها در فایل کاربر ذخیره می‌شوند و پوشه‌ای لازم نیست
+    if packed_store.enabled():
+        return folder_path
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
         print(f"[✔] پوشه کاربر ایجاد شد: {folder_path}")
@@ -31,63 +105,68 @@ def create_user_folder(user_id, user_name):
     return folder_path
 
 # جمع‌آوری چهره‌ها
-def capture_faces(app, user_id, user_name, num_samples=20, ip_stream_url="http://192.168.1.3:4747/video"):
+def capture_faces(app, user_id, user_name, num_samples=20, ip_stream_url="http://192.168.1.3:4747/video", on_complete=None):
     if app.is_processing:
         messagebox.showwarning("هشدار", "در حال انجام عملیات دیگری هستید!")
         return
+    if wait_for_warmup(app, lambda: capture_faces(app, user_id, user_name, num_samples, ip_stream_url, on_complete)):
+        return
     app.is_processing = True
     folder_path = create_user_folder(user_id, user_name)
 
     print(f"[🔍] در حال اتصال به دوربین: {ip_stream_url}")
-    cap = cv2.VideoCapture(ip_stream_url if ip_stream_url else 0)
-    if not cap.isOpened():
-        messagebox.showerror("خطا", "نمی‌توان به دوربین متصل شد! آدرس IP یا اتصال را بررسی کنید.")
-        app.is_processing = False
-        return
-
-    sample_count = 0
-    app.cap = cap
-    app.canvas.delete("all")  # پاک کردن کادر
+    app.enrollment = EnrollmentWriter(folder_path, max_samples=num_samples)
+    app.cap = open_camera(app, ip_stream_url if ip_stream_url else 0)
+    app.detector = DetectionScheduler(get_cascade())
+    app.clear_canvas()  # پاک کردن کادر
 
     def update_frame():
-        nonlocal sample_count
         if not app.is_processing:
             return
         ret, frame = app.cap.read()
         if not ret:
-            messagebox.showerror("خطا", "خواندن تصویر از دوربین با خطا مواجه شد.")
-            app.stop_camera()
+            # هنوز فریم تازه‌ای نرسیده؛ رابط کاربری منتظر دوربین نمی‌ماند
+            if app.cap.stalled(CAMERA_TIMEOUT):
+                if app.cap.frames_read == 0:
+                    messagebox.showerror("خطا", "نمی‌توان به دوربین متصل شد! آدرس IP یا اتصال را بررسی کنید.")
+                else:
+                    messagebox.showerror("خطا", "خواندن تصویر از دوربین با خطا مواجه شد.")
+                app.stop_camera()
+                return
+            app.root.after(10, update_frame)
             return
 
+        frame_start = time.perf_counter()
+        app.metrics.add("camera", app.cap.frame_age_ms)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
-
-        for (x, y, w, h) in faces:
-            sample_count += 1
-            face_img = gray[y:y + h, x:x + w]
-            img_path = os.path.join(folder_path, f"{sample_count}.jpg")
-            cv2.imwrite(img_path, face_img)
+        start = app.metrics.record("convert", frame_start)
+        faces = app.detector.update(gray)
+        start = app.metrics.record("detect", start)
+
+        for _, (x, y, w, h) in faces:
+            # فقط کادرهای حاصل از تشخیص کامل ذخیره می‌شوند، نه کادرهای ردیابی‌شده؛
+            # هم‌اندازه کردن، حذف نمونه‌های تکراری یا تار و نوشتن در رشته پس‌زمینه انجام می‌شود
+            if app.detector.detected:
+                app.enrollment.submit(gray[y:y + h, x:x + w])
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv2.putText(frame, f"Sample {sample_count}/{num_samples}", (10, 30),
+            cv2.putText(frame, app.enrollment.status(), (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        app.metrics.record("save", start)
 
         app.display_frame(frame)
-        if sample_count >= num_samples:
-            messagebox.showinfo("موفقیت", f"{sample_count} تصویر برای {user_name} ذخیره شد!")
+        app.metrics.record("frame", frame_start)
+        app.metrics.frame_done()
+        if app.enrollment.accepted >= num_samples:
             app.stop_camera()
+            messagebox.showinfo("موفقیت", f"{num_samples} تصویر برای {user_name} ذخیره شد!")
             app.is_processing = False
+            if on_complete:
+                on_complete()
             return
         app.root.after(10, update_frame)
 
     update_frame()
 
-# ثبت ورود موفق
-def log_access(user_id, user_name):
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_PATH, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow([user_id, user_name, now])
-
 # تشخیص چهره
 def recognize_face(app):
     if app.is_processing:
@@ -96,38 +175,53 @@ def recognize_face(app):
     if not os.path.exists(MODEL_PATH):
         messagebox.showerror("خطا", "فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.")
         return
-
-    app.is_processing = True
-    recognizer.read(MODEL_PATH)
-    cap = cv2.VideoCapture(0)  # برای تشخیص از وب‌کم استفاده می‌کنیم
-    if not cap.isOpened():
-        messagebox.showerror("خطا", "نمی‌توان به وب‌کم متصل شد!")
-        app.is_processing = False
+    if wait_for_warmup(app, lambda: recognize_face(app)):
         return
 
-    app.cap = cap
-    app.canvas.delete("all")
+    app.is_processing = True
+    recognizer = model_manager.get()
+    app.cap = open_camera(app, 0)  # برای تشخیص از وب‌کم استفاده می‌کنیم
+    app.detector = DetectionScheduler(get_cascade())
+    app.predictions = PredictionCache(recognizer)
+    app.clear_canvas()
     recognized = False
+    generation = trainer.generation
 
     def update_recognition():
-        nonlocal recognized
+        nonlocal recognized, generation
         if not app.is_processing:
             return
+        if trainer.generation != generation:
+            # آموزش پس‌زمینه تمام شده؛ جلسه بدون توقف با مدل جدید ادامه می‌یابد
+            generation = trainer.generation
+            app.predictions.set_recognizer(model_manager.get())
         ret, frame = app.cap.read()
         if not ret:
-            messagebox.showerror("خطا", "خواندن تصویر از دوربین با خطا مواجه شد.")
-            app.stop_camera()
+            if app.cap.stalled(CAMERA_TIMEOUT):
+                if app.cap.frames_read == 0:
+                    messagebox.showerror("خطا", "نمی‌توان به وب‌کم متصل شد!")
+                else:
+                    messagebox.showerror("خطا", "خواندن تصویر از دوربین با خطا مواجه شد.")
+                app.stop_camera()
+                return
+            app.root.after(10, update_recognition)
             return
 
+        frame_start = time.perf_counter()
+        app.metrics.add("camera", app.cap.frame_age_ms)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-
-        for (x, y, w, h) in faces:
-            face_img = gray[y:y + h, x:x + w]
-            label, confidence = recognizer.predict(face_img)
-            if confidence < 70:
-                user_folder = os.listdir(DATA_DIR)[label]
-                user_id, user_name = user_folder.split("_", 1)
+        start = app.metrics.record("convert", frame_start)
+        faces = app.detector.update(gray)
+        start = app.metrics.record("detect", start)
+        app.predictions.prune([track_id for track_id, _ in faces])
+
+        for track_id, (x, y, w, h) in faces:
+            app.predictions.lookup(track_id, (x, y, w, h), gray)
+            label = app.predictions.accepted_label(track_id)
+            # برچسب‌های کاربران حذف‌شده در فهرست نیستند و ناشناس در نظر گرفته می‌شوند
+            entry = label_index.get(label) if label is not None else None
+            if entry is not None:
+                user_id, user_name = entry["folder"].split("_", 1)
                 log_access(user_id, user_name)
                 messagebox.showinfo("ورود موفق", f"خوش آمدید، {user_name} (ID: {user_id})")
                 recognized = True
@@ -137,27 +231,36 @@ def recognize_face(app):
             else:
                 cv2.putText(frame, "Unknown", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        app.metrics.record("predict", start)
 
         app.display_frame(frame)
+        app.metrics.record("frame", frame_start)
+        app.metrics.frame_done()
         if not recognized:
             app.root.after(10, update_recognition)
 
     update_recognition()
 
-# آموزش مدل
+# آموزش کامل مدل در پس‌زمینه؛ پیشرفت در نوار وضعیت نمایش داده می‌شود
 def train_model():
-    try:
-        subprocess.run(["python", "train_model.py"], check=True)
-        messagebox.showinfo("آموزش مدل", "مدل با موفقیت آموزش داده شد.")
-    except subprocess.CalledProcessError:
-        messagebox.showerror("خطا", "آموزش مدل با خطا مواجه شد.")
+    if not trainer.request(full=True):
+        print("[!] آموزش در جریان است؛ آموزش کامل پس از پایان آن دوباره اجرا می‌شود.")
+
+# به‌روزرسانی تدریجی مدل با تصاویر کاربر جدید در پس‌زمینه
+def update_model():
+    if not trainer.request(full=False):
+        print("[!] آموزش در جریان است؛ تصاویر جدید پس از پایان آن به مدل اضافه می‌شوند.")
 
 # لیست کاربران
 def list_users():
-    if not os.path.exists(DATA_DIR):
-        messagebox.showinfo("لیست کاربران", "هیچ کاربری ثبت نشده است.")
-        return
-    users = os.listdir(DATA_DIR)
+    # پس از مهاجرت به مخزن فشرده، فهرست کاربران فقط از فهرست کلی خوانده می‌شود
+    if packed_store.enabled():
+        users = packed_store.list_users()
+    else:
+        if not os.path.exists(DATA_DIR):
+            messagebox.showinfo("لیست کاربران", "هیچ کاربری ثبت نشده است.")
+            return
+        users = os.listdir(DATA_DIR)
     if not users:
         messagebox.showinfo("لیست کاربران", "هیچ کاربری وجود ندارد.")
         return
@@ -178,8 +281,16 @@ def delete_user():
     if not user:
         return
     path = os.path.join(DATA_DIR, user)
+    removed = packed_store.enabled() and packed_store.remove_user(user)
     if os.path.exists(path):
         shutil.rmtree(path)
+        removed = True
+    if removed:
+        user_id = user.split("_", 1)[0]
+        if user_id.isdigit():
+            label_index.remove(user_id)
+        # بخش کاربر از مدل کنار گذاشته و بقیه بخش‌ها بدون آموزش دوباره ترکیب می‌شوند
+        update_model()
         messagebox.showinfo("حذف شد", f"کاربر {user} با موفقیت حذف شد.")
     else:
         messagebox.showerror("خطا", "این کاربر وجود ندارد.")
@@ -195,42 +306,112 @@ def rename_user():
         return
     old_path = os.path.join(DATA_DIR, old_name)
     new_path = os.path.join(DATA_DIR, f"{user_id}_{new_name}")
+    renamed = packed_store.enabled() and packed_store.rename_user(old_name, f"{user_id}_{new_name}")
     if os.path.exists(old_path):
         os.rename(old_path, new_path)
+        renamed = True
+    if renamed:
+        if user_id.isdigit():
+            label_index.rename(user_id, new_name)
         messagebox.showinfo("ویرایش موفق", "نام کاربر با موفقیت تغییر یافت.")
     else:
         messagebox.showerror("خطا", "پوشه کاربر یافت نشد.")
 
 # مشاهده گزارش ورود
 def view_logs():
-    if not os.path.exists(LOG_PATH):
+    if not os.path.exists(LOG_PATH) and not os.path.exists(LEGACY_CSV_PATH):
         messagebox.showinfo("گزارش ورود", "هیچ گزارشی ثبت نشده است.")
         return
     win = tk.Toplevel()
     win.title("📊 گزارش ورود کاربران")
+
+    # فیلتر بر اساس آیدی کاربر و بازه زمانی (YYYY-MM-DD)
+    filters = tk.Frame(win)
+    filters.pack(fill=tk.X)
+    tk.Label(filters, text="آیدی:").pack(side=tk.RIGHT)
+    user_entry = tk.Entry(filters, width=8)
+    user_entry.pack(side=tk.RIGHT)
+    tk.Label(filters, text="از:").pack(side=tk.RIGHT)
+    start_entry = tk.Entry(filters, width=12)
+    start_entry.pack(side=tk.RIGHT)
+    tk.Label(filters, text="تا:").pack(side=tk.RIGHT)
+    end_entry = tk.Entry(filters, width=12)
+    end_entry.pack(side=tk.RIGHT)
+
     tree = ttk.Treeview(win, columns=("ID", "Name", "Time"), show="headings")
     tree.heading("ID", text="ID")
     tree.heading("Name", text="نام")
     tree.heading("Time", text="زمان")
+    scrollbar = ttk.Scrollbar(win, orient=tk.VERTICAL, command=tree.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     tree.pack(fill=tk.BOTH, expand=True)
-    with open(LOG_PATH, encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) == 3:
-                tree.insert("", "end", values=(row[0], row[1], row[2]))
+
+    state = {"after": None, "done": False}
+
+    # بارگذاری صفحه بعدی گزارش‌ها، فقط وقتی کاربر به انتهای فهرست رسیده است
+    def load_page():
+        if state["done"]:
+            return
+        end = end_entry.get().strip()
+        if len(end) == 10:
+            end += " 23:59:59"
+        rows = query_logs(start=start_entry.get().strip() or None, end=end or None,
+                          user_id=user_entry.get().strip() or None, limit=LOG_PAGE_SIZE, after=state["after"])
+        for _, user_id, user_name, logged_at in rows:
+            tree.insert("", "end", values=(user_id, user_name, logged_at))
+        if rows:
+            state["after"] = (rows[-1][3], rows[-1][0])
+        if len(rows) < LOG_PAGE_SIZE:
+            state["done"] = True
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        if float(last) >= 1.0:
+            load_page()
+
+    def search():
+        tree.delete(*tree.get_children())
+        state["after"], state["done"] = None, False
+        load_page()
+
+    tk.Button(filters, text="جست‌وجو", command=search).pack(side=tk.LEFT)
+    tree.configure(yscrollcommand=on_scroll)
+    load_page()
 
 class FaceRecognitionApp:
     def __init__(self, root):
+        started = time.perf_counter()
         self.root = root
         self.root.title("سیستم احراز هویت با تشخیص چهره")
         self.root.geometry("600x600")
         self.root.config(bg="#F5F5F5")
         self.cap = None
+        self.detector = None
+        self.predictions = None
+        self.enrollment = None
         self.is_processing = False
-
-        # کادر برای نمایش تصویر دوربین
-        self.canvas = tk.Canvas(root, width=320, height=240, bg="black")
+        # انتقال گزارش‌های CSV قدیمی در پس‌زمینه، پیش از باز شدن پنجره گزارش
+        start_writer()
+
+        # معیارهای زمانی مسیر اصلی و متن اختیاری روی تصویر
+        self.metrics = Metrics()
+        self.show_overlay = SHOW_METRICS_OVERLAY
+        self.overlay = None
+        self.overlay_text = ""
+        self.overlay_time = 0.0
+        self.root.bind("<F2>", self.toggle_overlay)
+
+        # کادر برای نمایش تصویر دوربین؛ بافرها و تصویر Tk یک بار ساخته و در هر فریم بازنویسی می‌شوند
+        width, height = DISPLAY_SIZE
+        self.canvas = tk.Canvas(root, width=width, height=height, bg="black")
         self.canvas.pack(pady=10)
+        self.display_bgr = np.empty((height, width, 3), dtype=np.uint8)
+        # تصویر PIL مستقیماً روی حافظه بافر RGBA ساخته می‌شود (بدون کپی)
+        self.display_rgba = np.empty((height, width, 4), dtype=np.uint8)
+        self.display_image = Image.frombuffer("RGBA", DISPLAY_SIZE, self.display_rgba, "raw", "RGBA", 0, 1)
+        self.photo = ImageTk.PhotoImage("RGBA", DISPLAY_SIZE)
+        self.image_item = None
+        self.last_display = 0.0
 
         # استایل دکمه‌ها
         style = {"font": ("Vazirmatn", 12), "bg": "#1976D2", "fg": "white", "width": 30, "height": 2}
@@ -246,6 +427,15 @@ class FaceRecognitionApp:
         tk.Button(root, text="نمایش گزارش ورود", command=view_logs, **style).pack(pady=5)
         tk.Button(root, text="خروج", command=self.on_closing, **style).pack(pady=10)
 
+        # نوار وضعیت آموزش پس‌زمینه
+        self.status = tk.Label(root, text="", font=("Vazirmatn", 10), bg="#F5F5F5")
+        self.status.pack()
+        self.poll_training()
+
+        # آماده‌سازی پس از نمایش پنجره شروع می‌شود
+        self.warmup = None
+        self.root.after_idle(self.start_warmup, started)
+
     def register_new_user(self):
         user_id = simpledialog.askstring("ثبت‌نام کاربر", "آیدی عددی کاربر را وارد کنید:")
         if not user_id:
@@ -254,27 +444,98 @@ class FaceRecognitionApp:
         if not user_name:
             return
         ip_url = simpledialog.askstring("دوربین IP", "آدرس دوربین IP را وارد کنید (خالی برای وب‌کم):")
-        capture_faces(self, user_id, user_name, ip_stream_url=ip_url if ip_url else None)
-        train_model()
+        capture_faces(self, user_id, user_name, ip_stream_url=ip_url if ip_url else None, on_complete=update_model)
 
+    # کوچک‌سازی پیش از تبدیل رنگ، در بافرهای از پیش ساخته؛ فقط پیکسل‌های همان یک تصویر Tk عوض می‌شوند
     def display_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = cv2.resize(frame, (320, 240))
-        img = Image.fromarray(frame)
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.canvas.imgtk = imgtk
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=imgtk)
+        now = time.monotonic()
+        if now - self.last_display < 1.0 / DISPLAY_FPS:
+            return
+        self.last_display = now
+
+        start = time.perf_counter()
+        cv2.resize(frame, DISPLAY_SIZE, dst=self.display_bgr, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.display_bgr, cv2.COLOR_BGR2RGBA, dst=self.display_rgba)
+        self.photo.paste(self.display_image)
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+        if self.show_overlay:
+            self.draw_overlay()
+        self.metrics.record("display", start)
+
+    # متن معیارها فقط هر OVERLAY_INTERVAL ثانیه دوباره ساخته می‌شود
+    def draw_overlay(self):
+        now = time.monotonic()
+        if now - self.overlay_time >= OVERLAY_INTERVAL:
+            self.overlay_time = now
+            self.overlay_text = "\n".join(self.metrics.overlay_lines())
+        if self.overlay is None:
+            self.overlay = self.canvas.create_text(5, 5, anchor=tk.NW, fill="yellow", font=("Courier", 8),
+                                                   text=self.overlay_text)
+        else:
+            self.canvas.itemconfig(self.overlay, text=self.overlay_text)
+
+    def toggle_overlay(self, event=None):
+        self.show_overlay = not self.show_overlay
+        if not self.show_overlay and self.overlay is not None:
+            self.canvas.delete(self.overlay)
+            self.overlay = None
 
     def stop_camera(self):
         self.is_processing = False
         if self.cap:
             self.cap.release()
             self.cap = None
+        if self.detector:
+            self.detector.report()
+            self.detector = None
+        if self.predictions:
+            self.predictions.report()
+            self.predictions = None
+        if self.enrollment:
+            self.enrollment.close()
+            self.enrollment = None
+        if self.metrics.frames:
+            self.metrics.export()
         cv2.destroyAllWindows()
+        self.clear_canvas()
+
+    def clear_canvas(self):
         self.canvas.delete("all")
+        self.image_item = None
+        self.overlay = None
+
+    def start_warmup(self, started):
+        print(f"[⏱] پنجره در {(time.perf_counter() - started) * 1000:.0f}ms نمایش داده شد.")
+        self.status.config(text="⏳ در حال آماده‌سازی دوربین و مدل...")
+        self.warmup = start_warmup()
+        self.poll_warmup()
+
+    # پس از رویداد done دیگر نیازی به بررسی دوره‌ای نیست
+    def poll_warmup(self):
+        for event in self.warmup.poll():
+            if event[0] == "error":
+                print(f"[!] آماده‌سازی {event[1]} با خطا مواجه شد؛ با اولین استفاده دوباره امتحان می‌شود.")
+            elif event[0] == "done":
+                self.status.config(text=f"[✔] سیستم در {event[1] / 1000:.1f} ثانیه آماده شد.")
+                return
+        self.root.after(WARMUP_POLL_INTERVAL, self.poll_warmup)
+
+    def poll_training(self):
+        for event in trainer.poll():
+            if event[0] == "progress":
+                self.status.config(text=event[1])
+            elif event[0] == "done":
+                self.status.config(text=f"[✔] مدل در {event[2]:.1f} ثانیه آموزش داده شد و جایگزین شد.")
+            else:
+                self.status.config(text="[×] آموزش مدل با خطا مواجه شد.")
+                messagebox.showerror("خطا", "آموزش مدل با خطا مواجه شد.")
+        self.root.after(TRAINING_POLL_INTERVAL, self.poll_training)
 
     def on_closing(self):
         self.stop_camera()
+        if self.warmup is not None:
+            self.warmup.close()
         self.root.destroy()
 
 if __name__ == "__main__":
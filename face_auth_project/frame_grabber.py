@@ -0,0 +1,163 @@
+import os
+import cv2
+import time
+import threading
+
+# خواندن فریم‌ها در یک رشته جداگانه؛ فقط تازه‌ترین فریم نگه داشته می‌شود
+class FrameGrabber:
+    def __init__(self, source, reconnect_delay=0.5, max_reconnect_delay=5.0):
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.cap = None
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.stopping = threading.Event()   # انتظار بین تلاش‌های اتصال با release فوراً قطع می‌شود
+
+        self.frame = None
+        self.frame_time = None
+        self.frame_seq = 0
+        self.consumed_seq = 0
+        self.started_at = None
+
+        # شمارنده‌ها
+        self.connected = False
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.read_latency_ms = 0.0
+        self.frame_age_ms = 0.0
+
+    def start(self):
+        self.running = True
+        self.stopping.clear()
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self.thread.start()
+        return self
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # در پشتیبان‌هایی که اجازه می‌دهند، صف داخلی دوربین را به یک فریم محدود می‌کنیم
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _run(self):
+        delay = self.reconnect_delay
+        lost = False
+        while self.running:
+            if self.cap is None:
+                self.cap = self._open()
+                if self.cap is None:
+                    self.stopping.wait(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+                self.connected = True
+
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            latency = (time.perf_counter() - start) * 1000
+            if not ret:
+                # قطع جریان: آزادسازی و تلاش دوباره با همان تأخیر فزاینده؛ منبعی که باز می‌شود ولی فریم نمی‌دهد
+                # نباید حلقه بی‌وقفه بسازد. پیام فقط یک بار در هر قطعی چاپ می‌شود
+                if not lost:
+                    print(f"[!] جریان دوربین قطع شد؛ تلاش برای اتصال دوباره به {self.source}")
+                    lost = True
+                self.connected = False
+                self.cap.release()
+                self.cap = None
+                self.reconnects += 1
+                self.stopping.wait(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            if lost:
+                print(f"[✔] اتصال دوباره به {self.source} برقرار شد.")
+                lost = False
+            delay = self.reconnect_delay
+
+            with self.lock:
+                if self.frame_seq > self.consumed_seq:
+                    self.frames_dropped += 1
+                self.frame = frame
+                self.frame_time = time.monotonic()
+                self.frame_seq += 1
+                self.frames_read += 1
+                self.read_latency_ms = 0.9 * self.read_latency_ms + 0.1 * latency if self.frames_read > 1 else latency
+
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.connected = False
+
+    # برگرداندن تازه‌ترین فریم؛ اگر فریم جدیدی نرسیده باشد (False, None) بدون انتظار برمی‌گردد
+    def read(self):
+        with self.lock:
+            if self.frame_seq == self.consumed_seq:
+                return False, None
+            self.consumed_seq = self.frame_seq
+            self.frame_age_ms = (time.monotonic() - self.frame_time) * 1000
+            return True, self.frame
+
+    # آیا مدت زیادی است که فریم تازه‌ای دریافت نشده؟
+    def stalled(self, timeout):
+        last = self.frame_time if self.frame_time is not None else self.started_at
+        return last is not None and time.monotonic() - last > timeout
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "reconnects": self.reconnects,
+            "read_latency_ms": round(self.read_latency_ms, 2),
+            "frame_age_ms": round(self.frame_age_ms, 2),
+        }
+
+    def release(self):
+        self.running = False
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        stats = self.stats()
+        print(f"[📷] فریم‌های خوانده‌شده: {stats['frames_read']}، دورریخته: {stats['frames_dropped']}، "
+              f"اتصال دوباره: {stats['reconnects']}، تأخیر خواندن: {stats['read_latency_ms']}ms")
+
+# فایل ویدیو به جای دوربین: همه فریم‌ها به ترتیب خوانده می‌شوند و در پایان فایل از ابتدا شروع می‌شود
+class VideoFileSource:
+    def __init__(self, path):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.frames_read = 0
+
+    def start(self):
+        return self
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.path)
+            ret, frame = self.cap.read()
+        if ret:
+            self.frames_read += 1
+        return ret, frame
+
+    def stalled(self, timeout):
+        return self.frames_read == 0
+
+    def stats(self):
+        return {"frames_dropped": 0, "reconnects": 0}
+
+    def release(self):
+        self.cap.release()
+
+# منبع تصویر از روی ورودی خط فرمان: فایل ویدیو، شماره وب‌کم یا آدرس دوربین IP
+def open_source(source):
+    if os.path.isfile(source):
+        return VideoFileSource(source)
+    return FrameGrabber(int(source) if source.isdigit() else source)
@@ -0,0 +1,323 @@
+import argparse
+import os
+import queue
+import sys
+import time
+import cv2
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from model_manager import MODEL_PATH
+from label_index import LabelIndex
+from frame_grabber import open_source
+from face_detector import load_cascade, DetectionScheduler
+from prediction_cache import PredictionCache
+from camera_service import SharedModel, attach_matcher
+
+RING_SLOTS = 4             # فریم‌های هم‌زمان در خط پردازش: یکی برای هر مرحله و یکی برای مصرف‌کننده
+FRAME_SIZE = (640, 480)    # فریم‌های با اندازه دیگر هنگام نوشتن در حلقه کوچک یا بزرگ می‌شوند
+REPORT_INTERVAL = 5.0      # فاصله گزارش آمار هر مرحله (ثانیه)
+MIN_CPUS = 2               # با کمتر از این تعداد هسته، سه پردازه از اجرای ترتیبی کندترند و اجرای ترتیبی انجام می‌شود
+
+# بافر حلقوی فریم‌ها در حافظه مشترک؛ برای هر خانه یک تصویر رنگی و یک تصویر خاکستری
+class FrameRing:
+    def __init__(self, slots=RING_SLOTS, size=FRAME_SIZE, name=None):
+        width, height = size
+        self.slots = slots
+        self.size = size
+        color_bytes = slots * height * width * 3
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=color_bytes + slots * height * width)
+        self.frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=self.shm.buf)
+        self.grays = np.ndarray((slots, height, width), dtype=np.uint8, buffer=self.shm.buf, offset=color_bytes)
+
+    def spec(self):
+        return self.slots, self.size, self.shm.name
+
+    @classmethod
+    def attach(cls, spec):
+        slots, size, name = spec
+        return cls(slots, size, name)
+
+    def close(self, unlink=False):
+        # نماهای numpy باید پیش از بستن حافظه مشترک آزاد شوند
+        del self.frames, self.grays
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+# تازه‌ترین مورد صف؛ موردهای قدیمی‌تر (مرحله عقب افتاده) دور ریخته و خانه‌هایشان آزاد می‌شوند
+def take_newest(items, free, timeout=0.1):
+    item = items.get(timeout=timeout)
+    dropped = 0
+    while True:
+        try:
+            newer = items.get_nowait()
+        except queue.Empty:
+            return item, dropped
+        free.put(item[0])
+        item = newer
+        dropped += 1
+
+# شمارش فریم‌ها و زمان کار هر مرحله و ارسال دوره‌ای آن به پردازه اصلی
+class StageStats:
+    def __init__(self, stage, events, interval=REPORT_INTERVAL):
+        self.stage = stage
+        self.events = events
+        self.interval = interval
+        self.processed = self.dropped = 0
+        self.busy_ms = 0.0
+        self.last_report = time.monotonic()
+
+    def add(self, start, dropped=0):
+        self.processed += 1
+        self.dropped += dropped
+        self.busy_ms += (time.perf_counter() - start) * 1000
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report()
+
+    # ارسال آمار بازه جاری؛ هنگام پایان مرحله هم صدا زده می‌شود تا اجراهای کوتاه‌تر از interval هم آمار داشته باشند
+    def report(self):
+        now = time.monotonic()
+        if self.processed:
+            self.events.put((self.stage, {
+                "fps": self.processed / (now - self.last_report),
+                "busy_ms": self.busy_ms / self.processed,
+                "dropped": self.dropped,
+            }))
+        self.processed = self.dropped = 0
+        self.busy_ms = 0.0
+        self.last_report = now
+
+# مرحله ۱: منتظر خانه آزاد می‌ماند و تازه‌ترین فریم دوربین را مستقیم در آن می‌نویسد؛
+# تا وقتی مراحل بعد عقب‌اند خانه آزادی نیست و فریم‌های دوربین در FrameGrabber دور ریخته می‌شوند
+def capture_stage(source, ring_spec, free, detect_queue, events, stop):
+    ring = FrameRing.attach(ring_spec)
+    height, width = ring.frames.shape[1:3]
+    cap = open_source(source).start()
+    stats = StageStats("capture", events)
+    seq = dropped = 0
+    try:
+        while not stop.is_set():
+            try:
+                slot = free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            ret, frame = cap.read()
+            while not ret and not stop.is_set():
+                time.sleep(0.005)
+                ret, frame = cap.read()
+            if not ret:
+                free.put(slot)
+                break
+
+            start = time.perf_counter()
+            if frame.shape[:2] == (height, width):
+                np.copyto(ring.frames[slot], frame)
+            else:
+                cv2.resize(frame, ring.size, dst=ring.frames[slot], interpolation=cv2.INTER_AREA)
+            detect_queue.put((slot, seq, time.monotonic()))
+            seq += 1
+            total_dropped = cap.stats()["frames_dropped"]
+            stats.add(start, total_dropped - dropped)
+            dropped = total_dropped
+    finally:
+        stats.report()
+        cap.release()
+        ring.close()
+
+# مرحله ۲: تبدیل به خاکستری در همان خانه و تشخیص یا ردیابی چهره‌ها
+def detect_stage(ring_spec, free, detect_queue, recognize_queue, events, stop):
+    cv2.setNumThreads(1)
+    ring = FrameRing.attach(ring_spec)
+    detector = DetectionScheduler(load_cascade())
+    stats = StageStats("detect", events)
+    try:
+        while not stop.is_set():
+            try:
+                (slot, seq, captured), dropped = take_newest(detect_queue, free)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            gray = cv2.cvtColor(ring.frames[slot], cv2.COLOR_BGR2GRAY, dst=ring.grays[slot])
+            faces = detector.update(gray)
+            recognize_queue.put((slot, seq, captured, faces))
+            stats.add(start, dropped)
+    finally:
+        stats.report()
+        ring.close()
+
+# مرحله ۳: شناسایی چهره‌ها با مدل مشترک و رأی‌گیری بین فریم‌ها
+def recognize_stage(ring_spec, model_spec, free, recognize_queue, output_queue, events, stop):
+    cv2.setNumThreads(1)
+    ring = FrameRing.attach(ring_spec)
+    shm, matcher = attach_matcher(model_spec)
+    label_index = LabelIndex(model_spec["model_path"])
+    predictions = PredictionCache(matcher)
+    stats = StageStats("recognize", events)
+    try:
+        while not stop.is_set():
+            try:
+                (slot, seq, captured, faces), dropped = take_newest(recognize_queue, free)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            gray = ring.grays[slot]
+            predictions.prune([track_id for track_id, _ in faces])
+            results = []
+            for track_id, box in faces:
+                label, confidence = predictions.lookup(track_id, box, gray)
+                accepted = predictions.accepted_label(track_id)
+                entry = label_index.get(accepted) if accepted is not None else None
+                results.append((track_id, box, int(label), float(confidence), entry["folder"] if entry else None))
+            output_queue.put((slot, seq, captured, results))
+            stats.add(start, dropped)
+    finally:
+        stats.report()
+        del matcher
+        shm.close()
+        ring.close()
+
+# خط پردازش سه‌مرحله‌ای در سه پردازه؛ بین مراحل فقط شماره خانه حلقه جابه‌جا می‌شود، نه خود فریم
+class FramePipeline:
+    def __init__(self, source, model_path=MODEL_PATH, slots=RING_SLOTS, size=FRAME_SIZE):
+        self.source = source
+        self.model_path = model_path
+        self.slots = slots
+        self.size = size
+        self.processes = []
+        self.stage_stats = {}
+
+    def start(self):
+        self.ring = FrameRing(self.slots, self.size)
+        self.model = SharedModel(self.model_path)
+        self.free = mp.Queue()
+        for slot in range(self.slots):
+            self.free.put(slot)
+        self.detect_queue = mp.Queue()
+        self.recognize_queue = mp.Queue()
+        self.output_queue = mp.Queue()
+        self.events = mp.Queue()
+        self.stop_event = mp.Event()
+
+        ring_spec = self.ring.spec()
+        stages = [
+            (capture_stage, (self.source, ring_spec, self.free, self.detect_queue, self.events, self.stop_event)),
+            (detect_stage, (ring_spec, self.free, self.detect_queue, self.recognize_queue, self.events, self.stop_event)),
+            (recognize_stage, (ring_spec, self.model.spec, self.free, self.recognize_queue, self.output_queue,
+                               self.events, self.stop_event)),
+        ]
+        for target, args in stages:
+            process = mp.Process(target=target, args=args, name=target.__name__, daemon=True)
+            process.start()
+            self.processes.append(process)
+        return self
+
+    # تازه‌ترین نتیجه: (خانه، شماره فریم، تأخیر از دریافت تا شناسایی به میلی‌ثانیه، نتایج) یا None
+    # فریم با frame(slot) خوانده می‌شود و پس از استفاده باید با release(slot) آزاد شود
+    def read(self, timeout=0.1):
+        try:
+            (slot, seq, captured, results), _ = take_newest(self.output_queue, self.free, timeout)
+        except queue.Empty:
+            return None
+        return slot, seq, (time.monotonic() - captured) * 1000, results
+
+    def frame(self, slot):
+        return self.ring.frames[slot]
+
+    def release(self, slot):
+        self.free.put(slot)
+
+    def stats(self):
+        while True:
+            try:
+                stage, stats = self.events.get_nowait()
+            except queue.Empty:
+                return self.stage_stats
+            self.stage_stats[stage] = stats
+
+    def stop(self):
+        self.stop_event.set()
+        # صف‌ها تا پایان پردازه‌ها خالی می‌شوند تا هیچ پردازه‌ای هنگام خروج منتظر نوشتن در صف نماند؛
+        # آمار پایانی مراحل نگه داشته می‌شود
+        queues = [self.free, self.detect_queue, self.recognize_queue, self.output_queue]
+        while any(process.is_alive() for process in self.processes):
+            for q in queues:
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+            self.stats()
+            for process in self.processes:
+                process.join(timeout=0.05)
+        self.stats()
+        self.ring.close(unlink=True)
+        self.model.close()
+
+# همان مراحل به ترتیب در یک رشته، برای مقایسه با خط پردازش
+def run_sequential(source, duration, model_path=MODEL_PATH):
+    from lbph_matcher import load_matcher
+    cap = open_source(source).start()
+    detector = DetectionScheduler(load_cascade())
+    predictions = PredictionCache(load_matcher(model_path))
+    frames = 0
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        ret, frame = cap.read()
+        if not ret:
+            time.sleep(0.005)
+            continue
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = detector.update(gray)
+        predictions.prune([track_id for track_id, _ in faces])
+        for track_id, box in faces:
+            predictions.lookup(track_id, box, gray)
+        frames += 1
+    cap.release()
+    print(f"[⏱] اجرای ترتیبی: {frames / (time.monotonic() - start):.1f} فریم بر ثانیه")
+
+def run_pipeline(source, duration, model_path=MODEL_PATH):
+    if (os.cpu_count() or 1) < MIN_CPUS:
+        print("[!] فقط یک هسته پردازنده در دسترس است؛ خط پردازش کندتر از اجرای ترتیبی است و اجرای ترتیبی انجام می‌شود.")
+        return run_sequential(source, duration, model_path)
+    pipeline = FramePipeline(source, model_path).start()
+    latencies = []
+    frames = 0
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < duration:
+            result = pipeline.read()
+            if result is None:
+                continue
+            slot, _, latency_ms, _ = result
+            pipeline.release(slot)
+            latencies.append(latency_ms)
+            frames += 1
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.monotonic() - start
+    pipeline.stop()
+    stats = pipeline.stats()
+
+    for stage in ("capture", "detect", "recognize"):
+        if stage in stats:
+            s = stats[stage]
+            print(f"   {stage}: {s['fps']:.1f} فریم بر ثانیه، {s['busy_ms']:.2f}ms برای هر فریم، دورریخته {s['dropped']}")
+    if latencies:
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"[⏱] خط پردازش: {frames / elapsed:.1f} فریم بر ثانیه، تأخیر p50 {p50:.1f}ms، p95 {p95:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="خط پردازش موازی دریافت، تشخیص و شناسایی با حافظه مشترک؛ "
+                                                 "روی دستگاه تک‌هسته‌ای کندتر است و به جای آن اجرای ترتیبی انجام می‌شود")
+    parser.add_argument("source", help="فایل ویدیو، شماره وب‌کم یا آدرس دوربین IP")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--sequential", action="store_true", help="اجرای ترتیبی همان مراحل برای مقایسه")
+    args = parser.parse_args()
+    if not os.path.exists(args.model):
+        sys.exit("[×] فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.")
+    if args.sequential:
+        run_sequential(args.source, args.duration, args.model)
+    else:
+        run_pipeline(args.source, args.duration, args.model)
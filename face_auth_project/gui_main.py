@@ -1,58 +1,122 @@
 import cv2
 import os
+import time
 import shutil
-import csv
+import threading
 import subprocess
-from datetime import datetime
+import numpy as np
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
+from model_manager import ModelManager
+from lbph_matcher import load_matcher
+from label_index import LabelIndex
+from access_log import log_access, query_logs, start_writer, LEGACY_CSV_PATH
+from frame_grabber import FrameGrabber
+from face_detector import load_cascade, detect_faces, DetectionScheduler
+from prediction_cache import PredictionCache
+from training_worker import BackgroundTrainer
+import packed_store
+from warmup import Warmup
 
 # مسیرهای اصلی پروژه
 DATA_DIR = "data"
 MODEL_PATH = "trained_model.yml"
-LOG_PATH = "access_log.csv"
-
-# ثبت ورود موفق
-def log_access(user_id, user_name):
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_PATH, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow([user_id, user_name, now])
+LOG_PATH = "access_log.db"
+LOG_PAGE_SIZE = 200
+
+# حداکثر زمان بدون دریافت فریم (ثانیه) پیش از اعلام خطای دوربین
+CAMERA_TIMEOUT = 10
+
+# فاصله بررسی پیشرفت آموزش پس‌زمینه (میلی‌ثانیه)
+TRAINING_POLL_INTERVAL = 200
+
+# دوربین پیش‌فرض که در آماده‌سازی پس‌زمینه باز می‌شود (وب‌کم)
+WARMUP_CAMERA = 0
+
+# مدل و Haar Cascade یک بار ساخته می‌شوند و بین ورودها در حافظه می‌مانند؛ ساخت آن‌ها پس از نمایش پنجره
+# در آماده‌سازی پس‌زمینه (یا با اولین استفاده) انجام می‌شود، نه هنگام import
+cascade_lock = threading.RLock()
+face_cascade = None
+label_index = LabelIndex(MODEL_PATH)
+model_manager = ModelManager(MODEL_PATH, loader=load_matcher)
+trainer = BackgroundTrainer(model_manager)
+warmup = None
+recognize_pending = False   # ورود درخواست شده و منتظر پایان آماده‌سازی است
+
+def get_cascade():
+    global face_cascade
+    with cascade_lock:
+        if face_cascade is None:
+            face_cascade = load_cascade()
+        return face_cascade
+
+def warm_model():
+    if os.path.exists(MODEL_PATH):
+        model_manager.get()
+
+# یک تشخیص و پیش‌بینی آزمایشی روی اولین فریم دوربین (یا تصویر سیاه) تا اولین ورود هزینه اجرای اول را نپردازد
+def warm_probe(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame is not None else np.zeros((480, 640), np.uint8)
+    with cascade_lock:
+        detect_faces(get_cascade(), gray)
+    if os.path.exists(MODEL_PATH):
+        model_manager.get().predict(cv2.resize(gray, (100, 100)))
 
 # تشخیص چهره و ورود
-def recognize_face():
+def recognize_face(root):
+    global recognize_pending
     if not os.path.exists(MODEL_PATH):
         messagebox.showerror("خطا", "فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.")
         return
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(MODEL_PATH)
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    # اگر آماده‌سازی هنوز تمام نشده، ورود پس از پایان آن شروع می‌شود تا دوربین دو بار باز نشود؛
+    # انتظار با root.after است و رشته Tk مسدود نمی‌شود
+    if warmup is not None and not warmup.ready():
+        if not recognize_pending:
+            recognize_pending = True
+            print("[!] آماده‌سازی در جریان است؛ ورود پس از پایان آن شروع می‌شود.")
+            wait_for_warmup(root)
+        return
+    recognizer = model_manager.get()
 
-    cap = cv2.VideoCapture(0)
+    cap = (warmup.take_camera(0) if warmup is not None else None) or FrameGrabber(0).start()
+    detector = DetectionScheduler(get_cascade())
+    predictions = PredictionCache(recognizer)
     recognized = False
+    generation = trainer.generation
 
     while True:
+        if trainer.generation != generation:
+            # آموزش پس‌زمینه تمام شده؛ جلسه بدون توقف با مدل جدید ادامه می‌یابد
+            generation = trainer.generation
+            predictions.set_recognizer(model_manager.get())
         ret, frame = cap.read()
         if not ret:
-            break
+            # منتظر فریم تازه از رشته دوربین؛ پنجره همچنان به کلیدها پاسخ می‌دهد
+            if cap.stalled(CAMERA_TIMEOUT) or cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            time.sleep(0.005)
+            continue
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = detector.update(gray)
+        predictions.prune([track_id for track_id, _ in faces])
 
-        for (x, y, w, h) in faces:
-            face_img = gray[y:y + h, x:x + w]
-            label, confidence = recognizer.predict(face_img)
+        for track_id, (x, y, w, h) in faces:
+            predictions.lookup(track_id, (x, y, w, h), gray)
+            label = predictions.accepted_label(track_id)
+            # برچسب‌های کاربران حذف‌شده در فهرست نیستند و ناشناس در نظر گرفته می‌شوند
+            entry = label_index.get(label) if label is not None else None
 
-            if confidence < 70:
-                user_folder = os.listdir(DATA_DIR)[label]
-                user_id, user_name = user_folder.split("_", 1)
+            if entry is not None:
+                user_id, user_name = entry["folder"].split("_", 1)
                 log_access(user_id, user_name)
                 messagebox.showinfo("ورود موفق", f"خوش آمدید، {user_name} (ID: {user_id})")
                 recognized = True
                 break
-            else:
+            elif predictions.rejected(track_id):
                 messagebox.showwarning("خطا", "چهره شناسایی نشد.")
+                predictions.prune([])
 
         if recognized:
             break
@@ -62,8 +126,18 @@ def recognize_face():
             break
 
     cap.release()
+    detector.report()
+    predictions.report()
     cv2.destroyAllWindows()
 
+def wait_for_warmup(root):
+    global recognize_pending
+    if not warmup.ready():
+        root.after(TRAINING_POLL_INTERVAL, wait_for_warmup, root)
+        return
+    recognize_pending = False
+    recognize_face(root)
+
 # ثبت‌نام کاربر جدید با اجرای capture_faces.py
 def register_new_user():
     user_id = simpledialog.askstring("ثبت‌نام کاربر", "آیدی عددی کاربر را وارد کنید:")
@@ -76,25 +150,30 @@ def register_new_user():
     try:
         subprocess.run(["python", "capture_faces.py", user_id, user_name], check=True)
         messagebox.showinfo("موفقیت", "تصاویر کاربر با موفقیت ثبت شدند.")
-        train_model()
+        update_model()
     except subprocess.CalledProcessError:
         messagebox.showerror("خطا", "در اجرای ثبت‌نام مشکلی پیش آمد.")
 
-# آموزش مدل با اجرای train_model.py
+# آموزش کامل مدل در پس‌زمینه؛ پیشرفت در نوار وضعیت نمایش داده می‌شود
 def train_model():
-    try:
-        subprocess.run(["python", "train_model.py"], check=True)
-        messagebox.showinfo("آموزش مدل", "مدل با موفقیت آموزش داده شد.")
-    except subprocess.CalledProcessError:
-        messagebox.showerror("خطا", "آموزش مدل با خطا مواجه شد.")
+    if not trainer.request(full=True):
+        print("[!] آموزش در جریان است؛ آموزش کامل پس از پایان آن دوباره اجرا می‌شود.")
+
+# به‌روزرسانی تدریجی مدل با تصاویر کاربر جدید در پس‌زمینه
+def update_model():
+    if not trainer.request(full=False):
+        print("[!] آموزش در جریان است؛ تصاویر جدید پس از پایان آن به مدل اضافه می‌شوند.")
 
 # لیست کاربران
 def list_users():
-    if not os.path.exists(DATA_DIR):
-        messagebox.showinfo("لیست کاربران", "هیچ کاربری ثبت نشده است.")
-        return
-
-    users = os.listdir(DATA_DIR)
+    # پس از مهاجرت به مخزن فشرده، فهرست کاربران فقط از فهرست کلی خوانده می‌شود
+    if packed_store.enabled():
+        users = packed_store.list_users()
+    else:
+        if not os.path.exists(DATA_DIR):
+            messagebox.showinfo("لیست کاربران", "هیچ کاربری ثبت نشده است.")
+            return
+        users = os.listdir(DATA_DIR)
     if not users:
         messagebox.showinfo("لیست کاربران", "هیچ کاربری وجود ندارد.")
         return
@@ -119,8 +198,16 @@ def delete_user():
         return
 
     path = os.path.join(DATA_DIR, user)
+    removed = packed_store.enabled() and packed_store.remove_user(user)
     if os.path.exists(path):
         shutil.rmtree(path)
+        removed = True
+    if removed:
+        user_id = user.split("_", 1)[0]
+        if user_id.isdigit():
+            label_index.remove(user_id)
+        # بخش کاربر از مدل کنار گذاشته و بقیه بخش‌ها بدون آموزش دوباره ترکیب می‌شوند
+        update_model()
         messagebox.showinfo("حذف شد", f"کاربر {user} با موفقیت حذف شد.")
     else:
         messagebox.showerror("خطا", "این کاربر وجود ندارد.")
@@ -139,45 +226,124 @@ def rename_user():
     old_path = os.path.join(DATA_DIR, old_name)
     new_path = os.path.join(DATA_DIR, f"{user_id}_{new_name}")
 
+    renamed = packed_store.enabled() and packed_store.rename_user(old_name, f"{user_id}_{new_name}")
     if os.path.exists(old_path):
         os.rename(old_path, new_path)
+        renamed = True
+    if renamed:
+        if user_id.isdigit():
+            label_index.rename(user_id, new_name)
         messagebox.showinfo("ویرایش موفق", "نام کاربر با موفقیت تغییر یافت.")
     else:
         messagebox.showerror("خطا", "پوشه کاربر یافت نشد.")
 
 # مشاهده گزارش ورود
 def view_logs():
-    if not os.path.exists(LOG_PATH):
+    if not os.path.exists(LOG_PATH) and not os.path.exists(LEGACY_CSV_PATH):
         messagebox.showinfo("گزارش ورود", "هیچ گزارشی ثبت نشده است.")
         return
-
     win = tk.Toplevel()
     win.title("📊 گزارش ورود کاربران")
 
+    # فیلتر بر اساس آیدی کاربر و بازه زمانی (YYYY-MM-DD)
+    filters = tk.Frame(win)
+    filters.pack(fill=tk.X)
+    tk.Label(filters, text="آیدی:").pack(side=tk.RIGHT)
+    user_entry = tk.Entry(filters, width=8)
+    user_entry.pack(side=tk.RIGHT)
+    tk.Label(filters, text="از:").pack(side=tk.RIGHT)
+    start_entry = tk.Entry(filters, width=12)
+    start_entry.pack(side=tk.RIGHT)
+    tk.Label(filters, text="تا:").pack(side=tk.RIGHT)
+    end_entry = tk.Entry(filters, width=12)
+    end_entry.pack(side=tk.RIGHT)
+
     tree = ttk.Treeview(win, columns=("ID", "Name", "Time"), show="headings")
     tree.heading("ID", text="ID")
     tree.heading("Name", text="نام")
     tree.heading("Time", text="زمان")
+    scrollbar = ttk.Scrollbar(win, orient=tk.VERTICAL, command=tree.yview)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     tree.pack(fill=tk.BOTH, expand=True)
 
-    with open(LOG_PATH, encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) == 3:
-                tree.insert("", "end", values=(row[0], row[1], row[2]))
+    state = {"after": None, "done": False}
+
+    # بارگذاری صفحه بعدی گزارش‌ها، فقط وقتی کاربر به انتهای فهرست رسیده است
+    def load_page():
+        if state["done"]:
+            return
+        end = end_entry.get().strip()
+        if len(end) == 10:
+            end += " 23:59:59"
+        rows = query_logs(start=start_entry.get().strip() or None, end=end or None,
+                          user_id=user_entry.get().strip() or None, limit=LOG_PAGE_SIZE, after=state["after"])
+        for _, user_id, user_name, logged_at in rows:
+            tree.insert("", "end", values=(user_id, user_name, logged_at))
+        if rows:
+            state["after"] = (rows[-1][3], rows[-1][0])
+        if len(rows) < LOG_PAGE_SIZE:
+            state["done"] = True
+
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        if float(last) >= 1.0:
+            load_page()
+
+    def search():
+        tree.delete(*tree.get_children())
+        state["after"], state["done"] = None, False
+        load_page()
+
+    tk.Button(filters, text="جست‌وجو", command=search).pack(side=tk.LEFT)
+    tree.configure(yscrollcommand=on_scroll)
+    load_page()
+
+# آماده‌سازی پس از نمایش پنجره؛ زمان نمایش پنجره و مراحل آماده‌سازی گزارش می‌شود
+def start_warmup(root, status, started):
+    global warmup
+    print(f"[⏱] پنجره در {(time.perf_counter() - started) * 1000:.0f}ms نمایش داده شد.")
+    status.config(text="⏳ در حال آماده‌سازی دوربین و مدل...")
+    steps = [("cascade", get_cascade), ("model", warm_model), ("labels", label_index.preload)]
+    warmup = Warmup(steps, camera_source=WARMUP_CAMERA, probe=warm_probe).start()
+    poll_warmup(root, status)
+
+# پس از رویداد done دیگر نیازی به بررسی دوره‌ای نیست
+def poll_warmup(root, status):
+    for event in warmup.poll():
+        if event[0] == "error":
+            print(f"[!] آماده‌سازی {event[1]} با خطا مواجه شد؛ با اولین استفاده دوباره امتحان می‌شود.")
+        elif event[0] == "done":
+            status.config(text=f"[✔] سیستم در {event[1] / 1000:.1f} ثانیه آماده شد.")
+            return
+    root.after(TRAINING_POLL_INTERVAL, poll_warmup, root, status)
+
+# نمایش پیشرفت آموزش پس‌زمینه در نوار وضعیت
+def poll_training(root, status):
+    for event in trainer.poll():
+        if event[0] == "progress":
+            status.config(text=event[1])
+        elif event[0] == "done":
+            status.config(text=f"[✔] مدل در {event[2]:.1f} ثانیه آموزش داده شد و جایگزین شد.")
+        else:
+            status.config(text="[×] آموزش مدل با خطا مواجه شد.")
+            messagebox.showerror("خطا", "آموزش مدل با خطا مواجه شد.")
+    root.after(TRAINING_POLL_INTERVAL, poll_training, root, status)
 
 # رابط گرافیکی اصلی
 def main_gui():
+    started = time.perf_counter()
+    # انتقال گزارش‌های CSV قدیمی در پس‌زمینه، پیش از باز شدن پنجره گزارش
+    start_writer()
     root = tk.Tk()
     root.title("سیستم احراز هویت با تشخیص چهره")
-    root.geometry("500x550")
+    root.geometry("500x580")
     root.config(bg="#F5F5F5")
 
     style = {"font": ("Vazirmatn", 12), "bg": "#1976D2", "fg": "white", "width": 30, "height": 2}
 
     tk.Label(root, text="سیستم تشخیص چهره", font=("Vazirmatn", 16, "bold"), bg="#F5F5F5").pack(pady=20)
 
-    tk.Button(root, text="ورود با تشخیص چهره", command=recognize_face, **style).pack(pady=5)
+    tk.Button(root, text="ورود با تشخیص چهره", command=lambda: recognize_face(root), **style).pack(pady=5)
     tk.Button(root, text="ثبت‌نام کاربر جدید", command=register_new_user, **style).pack(pady=5)
     tk.Button(root, text="آموزش دوباره مدل", command=train_model, **style).pack(pady=5)
     tk.Button(root, text="نمایش لیست کاربران", command=list_users, **style).pack(pady=5)
@@ -186,7 +352,14 @@ def main_gui():
     tk.Button(root, text="نمایش گزارش ورود", command=view_logs, **style).pack(pady=5)
     tk.Button(root, text="خروج", command=root.destroy, **style).pack(pady=10)
 
+    status = tk.Label(root, text="", font=("Vazirmatn", 10), bg="#F5F5F5")
+    status.pack()
+    poll_training(root, status)
+    root.after_idle(start_warmup, root, status, started)
+
     root.mainloop()
+    if warmup is not None:
+        warmup.close()
 
 if __name__ == "__main__":
     main_gui()
@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+from datetime import datetime
+from model_manager import MODEL_PATH
+
+# مسیر فهرست برچسب‌ها کنار فایل مدل
+def labels_path(model_path=MODEL_PATH):
+    return os.path.splitext(model_path)[0] + ".labels.json"
+
+def write_labels(entries, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+# ساخت فهرست برچسب‌ها (آیدی → نام، تعداد نمونه، زمان ثبت‌نام) از پوشه‌های آموزش‌دیده؛
+# کلید همیشه آیدی عددی بدون صفر ابتدایی است (برچسب مدل int(آیدی) است)
+def save_label_index(users, data_path, model_path=MODEL_PATH):
+    path = labels_path(model_path)
+    previous = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    entries = {}
+    for folder_name in sorted(users):
+        files = users[folder_name]
+        user_id, user_name = folder_name.split("_", 1) if "_" in folder_name else (folder_name, folder_name)
+        key = str(int(user_id))
+        if key in entries:
+            # چند پوشه با یک آیدی در مدل یک برچسب‌اند؛ نام اولین پوشه (به ترتیب نام) نگه داشته می‌شود
+            entry = entries[key]
+            print(f"[!] آیدی {key} تکراری است: '{folder_name}' با همان برچسب '{entry['folder']}' ثبت شد.")
+            entry["samples"] += len(files)
+            entry.setdefault("duplicates", []).append(folder_name)
+            continue
+
+        entry = previous.get(key, {})
+        enrolled_at = entry.get("enrolled_at")
+        if enrolled_at is None:
+            # زمان قدیمی‌ترین تصویر کاربر به عنوان زمان ثبت‌نام
+            folder_time = min((stamp[1] for stamp in files.values()), default=None)
+            if folder_time is None:
+                folder_time = os.stat(os.path.join(data_path, folder_name)).st_mtime_ns
+            enrolled_at = datetime.fromtimestamp(folder_time / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+        entries[key] = {
+            "folder": folder_name,
+            "name": user_name,
+            "samples": len(files),
+            "enrolled_at": enrolled_at,
+        }
+
+    write_labels(entries, path)
+
+# فهرست برچسب‌ها یک بار در حافظه بارگذاری می‌شود؛ جست‌وجو با زمان ثابت
+class LabelIndex:
+    def __init__(self, model_path=MODEL_PATH):
+        self.path = labels_path(model_path)
+        self.entries = {}
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    # بارگذاری دوباره فقط اگر فایل فهرست تغییر کرده باشد (مثلاً پس از آموزش دوباره)
+    def refresh(self):
+        if not os.path.exists(self.path):
+            self.entries, self.stamp = {}, None
+            return
+        stat = os.stat(self.path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp != self.stamp:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+            self.stamp = stamp
+
+    # بارگذاری از پیش (مثلاً در آماده‌سازی پس‌زمینه) تا اولین جست‌وجو منتظر خواندن فایل نماند
+    def preload(self):
+        with self.lock:
+            self.refresh()
+            return len(self.entries)
+
+    def get(self, label):
+        with self.lock:
+            self.refresh()
+            return self.entries.get(str(label))
+
+    def _save(self):
+        write_labels(self.entries, self.path)
+        stat = os.stat(self.path)
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+
+    def rename(self, user_id, new_name):
+        with self.lock:
+            self.refresh()
+            entry = self.entries.get(str(int(user_id)))
+            if entry is not None:
+                entry["name"] = new_name
+                entry["folder"] = f"{user_id}_{new_name}"
+                self._save()
+
+    def remove(self, user_id):
+        with self.lock:
+            self.refresh()
+            if self.entries.pop(str(int(user_id)), None) is not None:
+                self._save()
@@ -0,0 +1,169 @@
+import math
+import os
+import sys
+import time
+import numpy as np
+from model_manager import MODEL_PATH, binary_model_path, load_binary_model, load_model
+
+FLT_EPSILON = np.finfo(np.float32).eps
+
+# الگوی باینری محلی توسعه‌یافته، مطابق elbp در LBPHFaceRecognizer اوپن‌سی‌وی
+def elbp(src, radius=1, neighbors=8):
+    src = np.asarray(src, dtype=np.float32)
+    rows, cols = src.shape
+    h, w = rows - 2 * radius, cols - 2 * radius
+    center = src[radius:radius + h, radius:radius + w]
+    dst = np.zeros((h, w), dtype=np.int32)
+
+    for n in range(neighbors):
+        x = np.float32(radius * math.cos(2.0 * math.pi * n / float(np.float32(neighbors))))
+        y = np.float32(-radius * math.sin(2.0 * math.pi * n / float(np.float32(neighbors))))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        ty = np.float32(y - np.float32(fy))
+        tx = np.float32(x - np.float32(fx))
+        one = np.float32(1)
+        w1 = (one - tx) * (one - ty)
+        w2 = tx * (one - ty)
+        w3 = (one - tx) * ty
+        w4 = tx * ty
+
+        def shifted(dy, dx):
+            return src[radius + dy:radius + dy + h, radius + dx:radius + dx + w]
+
+        t = w1 * shifted(fy, fx) + w2 * shifted(fy, cx) + w3 * shifted(cy, fx) + w4 * shifted(cy, cx)
+        dst += ((t > center) | (np.abs(t - center) < FLT_EPSILON)).astype(np.int32) << n
+
+    return dst
+
+# هیستوگرام مکانی نرمال‌شده روی شبکه grid_x × grid_y، مطابق spatial_histogram اوپن‌سی‌وی
+def spatial_histogram(lbp_image, num_patterns, grid_x=8, grid_y=8):
+    rows, cols = lbp_image.shape
+    width, height = cols // grid_x, rows // grid_y
+    result = np.zeros(grid_x * grid_y * num_patterns, dtype=np.float32)
+    if width == 0 or height == 0:
+        return result
+
+    cells = lbp_image[:grid_y * height, :grid_x * width]
+    cell_index = (np.arange(grid_y * height) // height)[:, None] * grid_x + (np.arange(grid_x * width) // width)[None, :]
+    counts = np.bincount((cell_index * num_patterns + cells).ravel(), minlength=result.size)
+    result[:] = counts.astype(np.float32) * np.float32(1.0 / (width * height))
+    return result
+
+def lbph_histogram(face, radius=1, neighbors=8, grid_x=8, grid_y=8):
+    return spatial_histogram(elbp(face, radius, neighbors), 2 ** neighbors, grid_x, grid_y)
+
+# مقایسه دسته‌ای چهره‌ها با همه هیستوگرام‌های آموزش با فاصله Chi-Square (HISTCMP_CHISQR_ALT)
+class LbphMatcher:
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8, threshold=sys.float_info.max):
+        # ماتریس پیوسته هیستوگرام‌ها به صورت ترانهاده (هر سطر یک بین)، تا ستون‌های غیرصفر پرس‌وجو پشت سر هم خوانده شوند
+        self.histograms_t = np.ascontiguousarray(np.asarray(histograms, dtype=np.float32).T)
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.threshold = threshold
+        # جمع هر هیستوگرام؛ در اتحاد (a-b)²/(a+b) = a + b - 4ab/(a+b) استفاده می‌شود
+        self.histogram_sums = self.histograms_t.sum(axis=0, dtype=np.float64)
+
+    @property
+    def histograms(self):
+        return self.histograms_t.T
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def from_model(cls, model_path=MODEL_PATH):
+        model = load_binary_model(binary_model_path(model_path))
+        return cls(model["histograms"], model["labels"], model["radius"], model["neighbors"],
+                   model["grid_x"], model["grid_y"], model["threshold"])
+
+    @classmethod
+    def from_faces(cls, faces, labels, radius=1, neighbors=8, grid_x=8, grid_y=8):
+        histograms = np.vstack([lbph_histogram(face, radius, neighbors, grid_x, grid_y) for face in faces])
+        return cls(histograms, labels, radius, neighbors, grid_x, grid_y)
+
+    def histogram(self, face):
+        return lbph_histogram(face, self.radius, self.neighbors, self.grid_x, self.grid_y)
+
+    # فاصله یک هیستوگرام تا همه هیستوگرام‌های آموزش؛ فقط بین‌های غیرصفر پرس‌وجو محاسبه می‌شوند
+    # (جایی که پرس‌وجو صفر است سهم هر نمونه همان جمع خودش است) و بین‌ها در بسته‌های کوچک پردازش می‌شوند
+    def distances(self, query, block_rows=64):
+        query = np.asarray(query, dtype=np.float32)
+        nonzero = np.flatnonzero(query)
+        values = query[nonzero]
+        count = len(self.labels)
+        shared = np.zeros(count, dtype=np.float64)
+        block = np.empty((block_rows, count), dtype=np.float32)
+        denominator = np.empty((block_rows, count), dtype=np.float32)
+
+        for start in range(0, len(nonzero), block_rows):
+            rows = nonzero[start:start + block_rows]
+            q = values[start:start + block_rows, None]
+            b = block[:len(rows)]
+            d = denominator[:len(rows)]
+            np.take(self.histograms_t, rows, axis=0, out=b)
+            np.add(b, q, out=d)
+            np.multiply(b, q, out=b)
+            np.divide(b, d, out=b)
+            shared += b.sum(axis=0, dtype=np.float64)
+
+        return 2.0 * (self.histogram_sums + query.sum(dtype=np.float64) - 4.0 * shared)
+
+    # k برچسب نزدیک برای هر چهره: فهرستی از [(برچسب، فاصله), ...]
+    def match(self, faces, k=1):
+        results = []
+        for face in faces:
+            dist = self.distances(self.histogram(face))
+            if k == 1:
+                # مثل predict اوپن‌سی‌وی، در تساوی اولین نمونه انتخاب می‌شود
+                top = np.array([np.argmin(dist)])
+            else:
+                top = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(len(dist))
+                top = top[np.argsort(dist[top], kind="stable")]
+            results.append([(int(self.labels[i]), float(dist[i])) for i in top if dist[i] < self.threshold])
+        return results
+
+    # جایگزین مستقیم recognizer.predict: (برچسب، فاصله) یا (-1, بیشینه) اگر زیر آستانه نباشد
+    def predict(self, face):
+        best = self.match([face], k=1)[0]
+        if not best:
+            return -1, sys.float_info.max
+        return best[0]
+
+# بارگذاری ماتچر از نسخه باینری مدل؛ اگر نسخه باینری نباشد یا با YAML نخواند، مدل اوپن‌سی‌وی
+def load_matcher(model_path=MODEL_PATH):
+    path = binary_model_path(model_path)
+    if os.path.exists(path):
+        model = load_binary_model(path)
+        stat = os.stat(model_path)
+        if model["source_stamp"] == (stat.st_size, stat.st_mtime_ns):
+            return LbphMatcher(model["histograms"], model["labels"], model["radius"], model["neighbors"],
+                               model["grid_x"], model["grid_y"], model["threshold"])
+    print("[!] نسخه باینری مدل به‌روز نیست؛ مدل YAML بارگذاری می‌شود.")
+    return load_model(model_path)
+
+if __name__ == "__main__":
+    import cv2
+    from training_data import load_training_data
+
+    # تصاویر آینه‌شده به عنوان چهره‌های آزمایشی، تا فاصله‌ها صفر نباشند
+    faces, labels, _ = load_training_data()
+    faces = [cv2.flip(face, 1) for face in faces]
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(MODEL_PATH)
+    matcher = LbphMatcher.from_model(MODEL_PATH)
+
+    start = time.perf_counter()
+    expected = [recognizer.predict(face) for face in faces]
+    opencv_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    actual = [best[0] if best else (-1, sys.float_info.max) for best in matcher.match(faces)]
+    matcher_ms = (time.perf_counter() - start) * 1000
+
+    same_label = sum(e[0] == a[0] for e, a in zip(expected, actual))
+    max_error = max(abs(e[1] - a[1]) for e, a in zip(expected, actual))
+    print(f"[✔] برچسب یکسان: {same_label}/{len(faces)}، بیشترین اختلاف فاصله: {max_error:.2e}")
+    print(f"[⏱] OpenCV: {opencv_ms:.1f}ms، ماتچر برداری: {matcher_ms:.1f}ms")
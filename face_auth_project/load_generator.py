@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+import cv2
+from benchmark import padded, summarize
+from recognition_server import HOST, PORT
+
+DATA_DIR = "data"
+FRAME_SIDE = 240    # برش‌ها با حاشیه به این اندازه بزرگ می‌شوند تا Haar Cascade چهره را پیدا کند
+
+# فریم‌های ارسالی از تصاویر پوشه data؛ برش‌ها دقیقاً روی چهره‌اند و بدون حاشیه تشخیص داده نمی‌شوند
+def load_payloads(data_path=DATA_DIR, raw=False):
+    paths = sorted(glob.glob(os.path.join(data_path, "*", "*.jpg")) + glob.glob(os.path.join(data_path, "*", "*.png")))
+    payloads = []
+    for path in paths:
+        if raw:
+            with open(path, "rb") as f:
+                payloads.append(f.read())
+            continue
+        crop = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if crop is None:
+            continue
+        ok, encoded = cv2.imencode(".jpg", cv2.resize(padded(crop), (FRAME_SIDE, FRAME_SIDE)))
+        if ok:
+            payloads.append(encoded.tobytes())
+    if not payloads:
+        sys.exit(f"[×] هیچ تصویری در '{data_path}' یافت نشد.")
+    return payloads
+
+async def request(reader, writer, method, path, body=b"", headers=None):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split()[1])
+    length = 0
+    for line in head[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    return status, json.loads(await reader.readexactly(length)) if length else None
+
+# هر کاربر مجازی یک اتصال نگه می‌دارد و درخواست‌ها را پشت سر هم می‌فرستد
+async def client(host, port, payloads, offset, stop_at, deadline_ms, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            status, body = await request(reader, writer, "POST", "/recognize", payloads[i % len(payloads)],
+                                         {"X-Deadline-Ms": deadline_ms})
+            results.append((status, (time.perf_counter() - start) * 1000, body))
+            i += 1
+    finally:
+        writer.close()
+
+async def run_load(host=HOST, port=PORT, data_path=DATA_DIR, concurrency=8, duration=10.0, deadline_ms=1000,
+                   raw=False):
+    payloads = load_payloads(data_path, raw)
+    print(f"[🔍] {len(payloads)} تصویر، {concurrency} اتصال هم‌زمان به {host}:{port} به مدت {duration:.0f} ثانیه")
+    results = []
+    start = time.monotonic()
+    stop_at = start + duration
+    await asyncio.gather(*(client(host, port, payloads, n * 7, stop_at, deadline_ms, results)
+                           for n in range(concurrency)))
+    elapsed = time.monotonic() - start
+
+    statuses = Counter(status for status, _, _ in results)
+    ok = [(latency, body) for status, latency, body in results if status == 200]
+    print(f"[⏱] {len(results) / elapsed:.1f} درخواست بر ثانیه؛ وضعیت‌ها: "
+          + "، ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    if ok:
+        latency = summarize([latency for latency, _ in ok])
+        queue_ms = summarize([body["queue_ms"] for _, body in ok])
+        faces = sum(len(body["faces"]) for _, body in ok)
+        recognized = sum(face["recognized"] for _, body in ok for face in body["faces"])
+        print(f"   تأخیر سمت کاربر p50 {latency['p50_ms']}ms p95 {latency['p95_ms']}ms، "
+              f"انتظار در صف p50 {queue_ms['p50_ms']}ms؛ {faces} چهره، {recognized} شناخته‌شده")
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, "GET", "/stats", headers={"Connection": "close"})
+    writer.close()
+    print("   آمار سرویس: " + json.dumps(stats, ensure_ascii=False))
+    return results, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="تولید بار برای سرویس شناسایی با تصاویر پوشه data")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    parser.add_argument("--raw", action="store_true", help="ارسال خود فایل‌ها بدون حاشیه و بزرگ‌نمایی")
+    args = parser.parse_args()
+    asyncio.run(run_load(args.host, args.port, args.data, args.concurrency, args.duration, args.deadline_ms, args.raw))
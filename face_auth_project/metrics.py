@@ -0,0 +1,106 @@
+import os
+import time
+import numpy as np
+
+METRICS_PATH = "metrics.prom"
+WINDOW = 512              # تعداد آخرین نمونه‌های هر مرحله برای صدک‌ها
+EXPORT_INTERVAL = 10.0    # فاصله نوشتن فایل معیارها (ثانیه)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# زمان‌های یک مرحله در بافر حلقوی با اندازه ثابت؛ ثبت هر نمونه بدون تخصیص حافظه
+class StageStats:
+    def __init__(self, window=WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.position = 0
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, ms):
+        self.samples[self.position] = ms
+        self.position = (self.position + 1) % len(self.samples)
+        self.count += 1
+        self.total_ms += ms
+
+    # صدک‌ها فقط هنگام نمایش یا نوشتن فایل محاسبه می‌شوند، نه در هر فریم
+    def quantiles(self, quantiles=QUANTILES):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return [0.0] * len(quantiles)
+        return [float(value) for value in np.quantile(filled, quantiles)]
+
+# معیارهای مسیر اصلی: زمان هر مرحله، نرخ فریم و خروجی با قالب متنی Prometheus
+class Metrics:
+    def __init__(self, path=METRICS_PATH, window=WINDOW, export_interval=EXPORT_INTERVAL):
+        self.path = path
+        self.window = window
+        self.export_interval = export_interval
+        self.stages = {}
+        self.frame_times = np.zeros(window, dtype=np.float64)
+        self.frames = 0
+        self.last_export = time.monotonic()
+
+    # ثبت زمان سپری‌شده از start و برگرداندن زمان فعلی، تا مرحله بعد از همان‌جا شمرده شود
+    def record(self, stage, start):
+        now = time.perf_counter()
+        self.add(stage, (now - start) * 1000)
+        return now
+
+    def add(self, stage, ms):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats(self.window)
+        stats.add(ms)
+
+    # پایان پردازش یک فریم؛ فایل معیارها هر export_interval ثانیه یک بار نوشته می‌شود
+    def frame_done(self):
+        now = time.monotonic()
+        self.frame_times[self.frames % self.window] = now
+        self.frames += 1
+        if self.path and now - self.last_export >= self.export_interval:
+            self.export()
+
+    def fps(self):
+        count = min(self.frames, self.window)
+        if count < 2:
+            return 0.0
+        newest = self.frame_times[(self.frames - 1) % self.window]
+        oldest = self.frame_times[(self.frames - count) % self.window]
+        return (count - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    def summary(self):
+        return {stage: stats.quantiles() for stage, stats in self.stages.items()}
+
+    # متن کوتاه برای نمایش روی تصویر
+    def overlay_lines(self):
+        lines = [f"FPS {self.fps():.1f}"]
+        for stage, (p50, p95, p99) in self.summary().items():
+            lines.append(f"{stage} {p50:.1f}/{p95:.1f}/{p99:.1f}ms")
+        return lines
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP face_auth_stage_latency_ms Per-stage latency of the recognition loop in milliseconds.",
+            "# TYPE face_auth_stage_latency_ms summary",
+        ]
+        for stage, stats in self.stages.items():
+            for quantile, value in zip(QUANTILES, stats.quantiles()):
+                lines.append(f'face_auth_stage_latency_ms{{stage="{stage}",quantile="{quantile}"}} {value:.3f}')
+            lines.append(f'face_auth_stage_latency_ms_sum{{stage="{stage}"}} {stats.total_ms:.3f}')
+            lines.append(f'face_auth_stage_latency_ms_count{{stage="{stage}"}} {stats.count}')
+        lines += [
+            "# HELP face_auth_fps Frames processed per second over the recent window.",
+            "# TYPE face_auth_fps gauge",
+            f"face_auth_fps {self.fps():.3f}",
+            "# HELP face_auth_frames_total Frames processed since start.",
+            "# TYPE face_auth_frames_total counter",
+            f"face_auth_frames_total {self.frames}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    # نوشتن اتمی، تا جمع‌کننده معیارها هیچ‌وقت فایل نیمه‌کاره نخواند
+    def export(self):
+        self.last_export = time.monotonic()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.path)
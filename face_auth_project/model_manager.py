@@ -0,0 +1,118 @@
+import cv2
+import os
+import hashlib
+import threading
+import numpy as np
+
+MODEL_PATH = "trained_model.yml"
+
+# مسیر نسخه باینری مدل کنار فایل YAML
+def binary_model_path(model_path):
+    return os.path.splitext(model_path)[0] + ".npz"
+
+def file_checksum(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ذخیره مدل: YAML با داده‌های base64 (قابل خواندن با recognizer.read) و نسخه باینری npz
+def save_model(recognizer, model_path=MODEL_PATH):
+    write_model(recognizer.getHistograms(), recognizer.getLabels(), recognizer.getRadius(), recognizer.getNeighbors(),
+                recognizer.getGridX(), recognizer.getGridY(), recognizer.getThreshold(), model_path)
+
+# همان قالب save_model از روی هیستوگرام‌های آماده (مثلاً هیستوگرام‌های ترکیب‌شده بخش‌های مدل)
+def write_model(histograms, labels, radius, neighbors, grid_x, grid_y, threshold, model_path=MODEL_PATH):
+    tmp_path = model_path + ".tmp.yml"
+    fs = cv2.FileStorage(tmp_path, cv2.FILE_STORAGE_WRITE | cv2.FILE_STORAGE_BASE64)
+    fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+    fs.write("threshold", threshold)
+    fs.write("radius", radius)
+    fs.write("neighbors", neighbors)
+    fs.write("grid_x", grid_x)
+    fs.write("grid_y", grid_y)
+    fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+    for histogram in histograms:
+        fs.write("", np.asarray(histogram, dtype=np.float32).reshape(1, -1))
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(labels, dtype=np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+
+    # os.replace زمان تغییر را حفظ می‌کند؛ اندازه و زمان فایل موقت همان مشخصات فایل نهایی است
+    stat = os.stat(tmp_path)
+    write_binary_model(binary_model_path(model_path), histograms, labels, (radius, neighbors, grid_x, grid_y),
+                       threshold, source_stamp=(stat.st_size, stat.st_mtime_ns))
+    os.replace(tmp_path, model_path)
+
+def save_binary_model(recognizer, path, histograms=None, labels=None, source_stamp=(0, 0)):
+    if histograms is None:
+        histograms = recognizer.getHistograms()
+    if labels is None:
+        labels = recognizer.getLabels()
+    write_binary_model(path, histograms, labels,
+                       (recognizer.getRadius(), recognizer.getNeighbors(), recognizer.getGridX(), recognizer.getGridY()),
+                       recognizer.getThreshold(), source_stamp)
+
+def write_binary_model(path, histograms, labels, params, threshold, source_stamp=(0, 0)):
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path,
+             histograms=np.vstack(histograms).astype(np.float32) if len(histograms) else np.zeros((0, 0), np.float32),
+             labels=np.asarray(labels, dtype=np.int32).ravel(),
+             params=np.array(params, dtype=np.int32),
+             threshold=np.float64(threshold),
+             source_stamp=np.array(source_stamp, dtype=np.int64))
+    os.replace(tmp_path, path)
+
+# خواندن نسخه باینری: هیستوگرام‌ها در یک ماتریس پیوسته به همراه برچسب‌ها و پارامترها؛
+# فایل‌های قدیمی‌تر source_stamp ندارند و None برمی‌گردانند تا نسخه باینری کهنه حساب شود
+def load_binary_model(path):
+    with np.load(path) as data:
+        radius, neighbors, grid_x, grid_y = data["params"].tolist()
+        return {
+            "histograms": data["histograms"],
+            "labels": data["labels"],
+            "radius": radius,
+            "neighbors": neighbors,
+            "grid_x": grid_x,
+            "grid_y": grid_y,
+            "threshold": float(data["threshold"]),
+            "source_stamp": tuple(data["source_stamp"].tolist()) if "source_stamp" in data.files else None,
+        }
+
+def load_model(model_path=MODEL_PATH):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    return recognizer
+
+# نگه‌داشتن مدل در حافظه و بارگذاری مجدد فقط وقتی فایل مدل واقعاً تغییر کرده باشد
+class ModelManager:
+    def __init__(self, model_path=MODEL_PATH, loader=load_model):
+        self.model_path = model_path
+        self.loader = loader
+        self.recognizer = None
+        self.stamp = None
+        self.checksum = None
+        self.lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.model_path)
+
+    def get(self):
+        with self.lock:
+            stat = os.stat(self.model_path)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            if self.recognizer is not None and stamp == self.stamp:
+                return self.recognizer
+
+            # زمان تغییر عوض شده؛ با چک‌سام مطمئن می‌شویم محتوا هم تغییر کرده است
+            checksum = file_checksum(self.model_path)
+            if self.recognizer is None or checksum != self.checksum:
+                self.recognizer = self.loader(self.model_path)
+                self.checksum = checksum
+                print(f"[✔] مدل از '{self.model_path}' بارگذاری شد.")
+            self.stamp = stamp
+            return self.recognizer
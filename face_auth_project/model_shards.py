@@ -0,0 +1,154 @@
+import os
+import time
+import cv2
+import numpy as np
+from model_manager import MODEL_PATH, write_model
+
+# مدل به بخش‌های جداگانه برای هر کاربر تقسیم می‌شود؛ هر بخش هیستوگرام‌های LBPH نمونه‌های همان کاربر است.
+# هیستوگرام هر نمونه مستقل از بقیه است، پس تغییر یک کاربر فقط بخش همان کاربر را دوباره می‌سازد
+# و مدل نهایی فقط کنار هم گذاشتن بخش‌هاست
+
+# پوشه بخش‌های مدل کنار فایل مدل
+def shards_path(model_path=MODEL_PATH):
+    return os.path.splitext(model_path)[0] + ".shards"
+
+# نام بخش فقط به آیدی بستگی دارد؛ تغییر نام کاربر بخش را تغییر نمی‌دهد.
+# پوشه‌هایی که آیدی یکسان دارند (مثلاً 4_aa و 4_bb) با هم یک بخش مشترک دارند
+def shard_file(model_path, user_id):
+    return os.path.join(shards_path(model_path), f"{int(user_id)}.npz")
+
+def load_shard(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        # نمونه‌هایی که خوانده نشدند با مشخصاتشان ثبت می‌شوند و تا تغییر فایل دوباره خوانده نمی‌شوند
+        failed = data["failed"].tolist() if "failed" in data.files else []
+        failed_stamps = data["failed_stamps"].tolist() if "failed_stamps" in data.files else []
+        return {
+            "names": data["names"].tolist(),
+            "stamps": data["stamps"].tolist(),
+            "histograms": data["histograms"],
+            "params": tuple(data["params"].tolist()),
+            "failed": dict(zip(failed, failed_stamps)),
+        }
+
+def save_shard(path, names, stamps, histograms, params, failed=None):
+    failed = failed or {}
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path,
+             names=np.array(names, dtype=str),
+             stamps=np.array(stamps, dtype=np.int64).reshape(-1, 2),
+             histograms=histograms,
+             params=np.array(params, dtype=np.int32),
+             failed=np.array(list(failed), dtype=str),
+             failed_stamps=np.array(list(failed.values()), dtype=np.int64).reshape(-1, 2))
+    os.replace(tmp_path, path)
+
+# هیستوگرام‌های LBPH نمونه‌ها با خود اوپن‌سی‌وی، تا با مدل آموزش‌دیده کامل یکسان باشند
+def compute_histograms(faces):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    params = (recognizer.getRadius(), recognizer.getNeighbors(), recognizer.getGridX(), recognizer.getGridY())
+    if len(faces) == 0:
+        return None, params
+    recognizer.train(faces, np.zeros(len(faces), dtype=np.int32))
+    return np.vstack(recognizer.getHistograms()).astype(np.float32), params
+
+# هم‌گام کردن بخش‌ها با نمونه‌های فعلی؛ users در قالب scan_data_folder است و
+# load_samples(پوشه، نام نمونه‌ها) چهره‌ها را به همان ترتیب برمی‌گرداند (None برای خواندن ناموفق).
+# با full=True همه بخش‌ها از نو ساخته می‌شوند. خروجی: (آیدی کاربران تغییرکرده، نمونه‌های محاسبه‌شده، بخش‌های حذف‌شده)
+def sync_shards(users, load_samples, model_path=MODEL_PATH, full=False):
+    shard_dir = shards_path(model_path)
+    os.makedirs(shard_dir, exist_ok=True)
+    changed = []
+    computed = 0
+
+    groups = {}
+    for folder_name, files in users.items():
+        groups.setdefault(str(int(folder_name.split("_")[0])), {})[folder_name] = files
+
+    for user_id, folders in groups.items():
+        # نام نمونه‌ها فقط وقتی چند پوشه آیدی یکسان دارند با نام پوشه همراه می‌شود
+        samples, sources = {}, {}
+        for folder_name, files in folders.items():
+            for image_name, stamp in files.items():
+                name = image_name if len(folders) == 1 else f"{folder_name}/{image_name}"
+                samples[name] = stamp
+                sources[name] = (folder_name, image_name)
+        path = shard_file(model_path, user_id)
+        shard = None if full else load_shard(path)
+
+        # نمونه‌هایی که با همان اندازه و زمان در بخش هستند (یا با همان مشخصات خوانده نشده بودند) نگه داشته می‌شوند
+        keep, known, failed = [], set(), {}
+        if shard is not None:
+            for i, (name, stamp) in enumerate(zip(shard["names"], shard["stamps"])):
+                if samples.get(name) == stamp:
+                    keep.append(i)
+                    known.add(name)
+            failed = {name: stamp for name, stamp in shard["failed"].items() if samples.get(name) == stamp}
+            known.update(failed)
+        new_names = [name for name in samples if name not in known]
+        if (shard is not None and not new_names and len(keep) == len(shard["names"])
+                and len(failed) == len(shard["failed"])):
+            continue
+
+        faces = {}
+        for folder_name in folders:
+            names = [name for name in new_names if sources[name][0] == folder_name]
+            faces.update(zip(names, load_samples(folder_name, [sources[name][1] for name in names])))
+        loaded = []
+        for name in new_names:
+            face = faces[name]
+            if face is None:
+                failed[name] = samples[name]
+            else:
+                loaded.append((name, face))
+        new_histograms, params = compute_histograms([face for _, face in loaded])
+        parts = []
+        if keep:
+            parts.append(shard["histograms"][keep])
+        if new_histograms is not None:
+            parts.append(new_histograms)
+        names = [shard["names"][i] for i in keep] + [name for name, _ in loaded]
+        stamps = [shard["stamps"][i] for i in keep] + [samples[name] for name, _ in loaded]
+        histograms = np.vstack(parts) if parts else np.zeros((0, 0), np.float32)
+        save_shard(path, names, stamps, histograms, params if shard is None else shard["params"], failed)
+        changed.append(int(user_id))
+        computed += len(loaded)
+
+    # بخش کاربران حذف‌شده همین‌جا کنار گذاشته می‌شود؛ چهره آن‌ها دیگر در مدل ترکیبی نیست
+    removed = 0
+    for name in os.listdir(shard_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == ".npz" and stem not in groups:
+            os.remove(os.path.join(shard_dir, name))
+            removed += 1
+
+    return changed, computed, removed
+
+# ترکیب بخش‌ها به ترتیب آیدی و نوشتن مدل در همان قالب save_model؛ False اگر نمونه‌ای نباشد
+def combine_shards(model_path=MODEL_PATH, threshold=None):
+    start = time.perf_counter()
+    shard_dir = shards_path(model_path)
+    histograms, labels = [], []
+    params = None
+    ids = []
+    if os.path.exists(shard_dir):
+        stems = [os.path.splitext(name) for name in os.listdir(shard_dir)]
+        ids = sorted(int(stem) for stem, ext in stems if ext == ".npz" and stem.isdigit())
+    for user_id in ids:
+        shard = load_shard(shard_file(model_path, user_id))
+        if len(shard["names"]) == 0:
+            continue
+        if params is not None and shard["params"] != params:
+            raise ValueError(f"پارامترهای بخش {user_id} با بقیه بخش‌ها یکسان نیست؛ آموزش کامل لازم است.")
+        params = shard["params"]
+        histograms.append(shard["histograms"])
+        labels.append(np.full(len(shard["names"]), user_id, dtype=np.int32))
+    if not histograms:
+        return False
+
+    if threshold is None:
+        threshold = cv2.face.LBPHFaceRecognizer_create().getThreshold()
+    write_model(np.vstack(histograms), np.concatenate(labels), *params, threshold, model_path)
+    print(f"[✔] {len(ids)} بخش مدل در {(time.perf_counter() - start) * 1000:.0f}ms ترکیب شد: '{model_path}'")
+    return True
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+from training_data import DATA_DIR, scan_data_folder, decode_images
+
+# مخزن فشرده نمونه‌ها: برای هر کاربر یک فایل با برش‌های هم‌اندازه uint8 و یک فهرست کلی
+PACKED_DIR = "data_packed"
+MANIFEST_NAME = "manifest.json"
+FACE_SIZE = (100, 100)     # همان اندازه نمونه‌های ثبت‌نام (enrollment_writer.FACE_SIZE)
+MAGIC = b"FACEPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII")   # نشان فایل، نسخه، تعداد نمونه، ارتفاع، عرض
+HEADER_SIZE = 64                    # پیکسل‌ها از این فاصله شروع می‌شوند تا نگاشت حافظه هم‌تراز باشد
+
+# فهرست در هر تغییر خوانده و بازنویسی می‌شود؛ رشته ثبت‌نام و رابط کاربری هم‌زمان آن را تغییر می‌دهند
+manifest_lock = threading.Lock()
+
+# مخزن فشرده هر پوشه داده کنار همان پوشه است (data → data_packed)
+def packed_path(data_path=DATA_DIR):
+    return os.path.normpath(data_path) + "_packed"
+
+def manifest_path(packed_dir=PACKED_DIR):
+    return os.path.join(packed_dir, MANIFEST_NAME)
+
+# مخزن فشرده فقط پس از مهاجرت (وجود فهرست) استفاده می‌شود
+def enabled(packed_dir=PACKED_DIR):
+    return os.path.exists(manifest_path(packed_dir))
+
+def load_manifest(packed_dir=PACKED_DIR):
+    path = manifest_path(packed_dir)
+    if not os.path.exists(path):
+        return {"face_size": list(FACE_SIZE), "users": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, packed_dir=PACKED_DIR):
+    path = manifest_path(packed_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+# نام فایل همان نام پوشه کاربر است تا دو پوشه با آیدی یکسان فایل یکدیگر را بازنویسی نکنند
+def user_file(folder_name):
+    return folder_name + ".faces"
+
+def write_header(f, count, size):
+    width, height = size
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, count, height, width).ljust(HEADER_SIZE, b"\0"))
+
+def normalize(face, size=FACE_SIZE):
+    if face.shape[:2] == (size[1], size[0]):
+        return face
+    return cv2.resize(face, size, interpolation=cv2.INTER_AREA)
+
+# نوشتن کامل نمونه‌های یک کاربر در فایل موقت و جایگزینی اتمی
+def write_user(folder_name, faces, packed_dir=PACKED_DIR, created_ns=None):
+    os.makedirs(packed_dir, exist_ok=True)
+    with manifest_lock:
+        manifest = load_manifest(packed_dir)
+        size = tuple(manifest["face_size"])
+        path = os.path.join(packed_dir, user_file(folder_name))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            write_header(f, len(faces), size)
+            for face in faces:
+                f.write(np.ascontiguousarray(normalize(face, size)).tobytes())
+        os.replace(tmp_path, path)
+        manifest["users"][folder_name] = {
+            "file": user_file(folder_name),
+            "count": len(faces),
+            # نمونه‌ها با شماره و این زمان شناخته می‌شوند؛ بازنویسی کامل یعنی نمونه‌های قبلی عوض شده‌اند
+            "created_ns": created_ns if created_ns is not None else time.time_ns(),
+        }
+        save_manifest(manifest, packed_dir)
+
+# افزودن نمونه‌ها به انتهای فایل کاربر؛ شمارنده سرآیند پس از نوشتن پیکسل‌ها به‌روز می‌شود
+# تا قطع شدن در میانه کار فقط بایت‌های اضافه‌ای بعد از نمونه‌های معتبر باقی بگذارد
+def append_user(folder_name, faces, packed_dir=PACKED_DIR):
+    with manifest_lock:
+        manifest = load_manifest(packed_dir)
+        entry = manifest["users"].get(folder_name)
+    if entry is None:
+        write_user(folder_name, faces, packed_dir)
+        return
+    if len(faces) == 0:
+        return
+
+    with manifest_lock:
+        manifest = load_manifest(packed_dir)
+        entry = manifest["users"][folder_name]
+        size = tuple(manifest["face_size"])
+        width, height = size
+        path = os.path.join(packed_dir, entry["file"])
+        count = entry["count"]
+        with open(path, "r+b") as f:
+            f.seek(HEADER_SIZE + count * width * height)
+            for face in faces:
+                f.write(np.ascontiguousarray(normalize(face, size)).tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            write_header(f, count + len(faces), size)
+        entry["count"] = count + len(faces)
+        save_manifest(manifest, packed_dir)
+
+# نگاشت حافظه نمونه‌های یک کاربر: آرایه (تعداد، ارتفاع، عرض) بدون خواندن فایل
+def read_user(folder_name, packed_dir=PACKED_DIR, manifest=None):
+    manifest = manifest or load_manifest(packed_dir)
+    entry = manifest["users"].get(folder_name)
+    width, height = manifest["face_size"]
+    if entry is None or entry["count"] == 0:
+        return np.zeros((0, height, width), np.uint8)
+    return np.memmap(os.path.join(packed_dir, entry["file"]), dtype=np.uint8, mode="r",
+                     offset=HEADER_SIZE, shape=(entry["count"], height, width))
+
+def remove_user(folder_name, packed_dir=PACKED_DIR):
+    with manifest_lock:
+        manifest = load_manifest(packed_dir)
+        entry = manifest["users"].pop(folder_name, None)
+        if entry is None:
+            return False
+        save_manifest(manifest, packed_dir)
+    path = os.path.join(packed_dir, entry["file"])
+    if os.path.exists(path):
+        os.remove(path)
+    return True
+
+# فایل نمونه‌ها هم تغییر نام می‌دهد تا کاربر تازه‌ای با نام قبلی فایل جداگانه بگیرد
+def rename_user(old_folder, new_folder, packed_dir=PACKED_DIR):
+    with manifest_lock:
+        manifest = load_manifest(packed_dir)
+        if new_folder != old_folder and new_folder in manifest["users"]:
+            return False
+        entry = manifest["users"].pop(old_folder, None)
+        if entry is None:
+            return False
+        os.replace(os.path.join(packed_dir, entry["file"]), os.path.join(packed_dir, user_file(new_folder)))
+        entry["file"] = user_file(new_folder)
+        manifest["users"][new_folder] = entry
+        save_manifest(manifest, packed_dir)
+    return True
+
+# فهرست کاربران فقط با خواندن فهرست کلی، بدون پیمایش پوشه‌ها
+def list_users(packed_dir=PACKED_DIR):
+    return list(load_manifest(packed_dir)["users"])
+
+# کاربران و نمونه‌ها در همان قالب scan_data_folder: {پوشه: {شماره نمونه: [0، زمان ساخت فایل]}}
+# نمونه‌ها فقط به انتها اضافه می‌شوند، پس به‌روزرسانی تدریجی مدل فقط شماره‌های جدید را می‌بیند
+def scan_packed(packed_dir=PACKED_DIR):
+    users = {}
+    for folder_name, entry in load_manifest(packed_dir)["users"].items():
+        if entry["count"] == 0:
+            continue
+        users[folder_name] = {str(i): [0, entry["created_ns"]] for i in range(entry["count"])}
+    return users
+
+# بارگذاری داده‌های آموزش مستقیم از فایل‌های نگاشت‌شده؛ هر چهره نمایی از همان نگاشت است
+def load_packed_data(packed_dir=PACKED_DIR, users=None):
+    start = time.perf_counter()
+    manifest = load_manifest(packed_dir)
+    if users is None:
+        users = scan_packed(packed_dir)
+    faces, labels = [], []
+    for folder_name, samples in users.items():
+        packed = read_user(folder_name, packed_dir, manifest)
+        label = int(folder_name.split("_")[0])
+        for name in samples:
+            faces.append(packed[int(name)])
+            labels.append(label)
+    print(f"⏱ بارگذاری {len(faces)} تصویر از مخزن فشرده: {(time.perf_counter() - start) * 1000:.1f}ms")
+    return faces, labels
+
+# مهاجرت از data/<id>_<name>/<n>.jpg؛ زمان قدیمی‌ترین تصویر به عنوان زمان ساخت نگه داشته می‌شود
+def migrate(data_path=DATA_DIR, packed_dir=PACKED_DIR):
+    start = time.perf_counter()
+    users = scan_data_folder(data_path)
+    os.makedirs(packed_dir, exist_ok=True)
+    migrated = files = source_bytes = samples = 0
+    for folder_name, images in sorted(users.items()):
+        if "_" not in folder_name or not folder_name.split("_")[0].isdigit():
+            print(f"[!] پوشه {folder_name} نام معتبری ندارد و منتقل نمی‌شود.")
+            continue
+        names = sorted(images, key=lambda name: (len(name), name))
+        decoded = decode_images([os.path.join(data_path, folder_name, name) for name in names])
+        faces = []
+        for name, image in zip(names, decoded):
+            if image is None:
+                print(f"[!] خواندن تصویر شکست خورد: {os.path.join(data_path, folder_name, name)}")
+                continue
+            faces.append(image)
+        created_ns = min((stamp[1] for stamp in images.values()), default=None)
+        write_user(folder_name, faces, packed_dir, created_ns)
+        files += len(names)
+        source_bytes += sum(stamp[0] for stamp in images.values())
+        samples += len(faces)
+        migrated += 1
+
+    if not enabled(packed_dir):
+        save_manifest(load_manifest(packed_dir), packed_dir)
+    packed_bytes = sum(os.path.getsize(os.path.join(packed_dir, entry["file"]))
+                       for entry in load_manifest(packed_dir)["users"].values())
+    print(f"[✔] {samples} نمونه از {files} فایل ({source_bytes / 1e6:.1f}MB) در {migrated} فایل "
+          f"({packed_bytes / 1e6:.1f}MB) در '{packed_dir}' ذخیره شد؛ {time.perf_counter() - start:.1f} ثانیه")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="مخزن فشرده نمونه‌های چهره: یک فایل برای هر کاربر")
+    parser.add_argument("--migrate", action="store_true", help="انتقال تصاویر پوشه داده به مخزن فشرده")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--packed", default=PACKED_DIR)
+    args = parser.parse_args()
+    if args.migrate:
+        migrate(args.data, args.packed)
+    for folder_name, entry in load_manifest(args.packed)["users"].items():
+        print(f"   {folder_name}: {entry['count']} نمونه")
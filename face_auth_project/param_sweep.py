@@ -0,0 +1,232 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from lbph_matcher import LbphMatcher
+from face_detector import load_cascade, detect_faces, box_iou, MIN_FACE_SIZE
+from prediction_cache import CONFIDENCE_THRESHOLD
+from train_model import DATA_DIR, scan_users, sample_loader
+from benchmark import SEED, summarize, synthetic_background, padded
+
+K_FOLDS = 5
+RADII = [1, 2]
+NEIGHBORS = [4, 8]
+GRIDS = [(4, 4), (6, 6), (8, 8)]
+THRESHOLDS = [40, 50, 60, 70, 80, 90, 100, 120]
+SCALE_FACTORS = [1.1, 1.2, 1.3, 1.4]
+MIN_NEIGHBORS = [3, 5]
+MIN_SIZES = [(30, 30), (60, 60), (90, 90)]
+DETECT_FRAMES = 40            # تعداد فریم‌های مصنوعی برای سنجش تشخیص چهره
+DETECT_FRAME_SIZE = (640, 480)
+DETECT_IOU = 0.3              # حداقل هم‌پوشانی کادر تشخیص با جای واقعی چهره
+TARGET_ACCURACY = 0.95
+MAX_FAR = 0.01
+TARGET_RECALL = 0.9
+
+# تنظیمات فعلی پروژه، برای مقایسه در خروجی
+CURRENT_LBPH = {"radius": 1, "neighbors": 8, "grid_x": 8, "grid_y": 8, "threshold": CONFIDENCE_THRESHOLD}
+CURRENT_DETECT = {"scale_factor": 1.3, "min_neighbors": 5, "min_size": list(MIN_FACE_SIZE)}
+
+# هر پردازه یک بار نمونه‌ها، Cascade و فریم‌های آزمایشی را می‌سازد؛ فقط پارامترها بین پردازه‌ها جابه‌جا می‌شوند
+worker = {}
+
+def load_gallery(data_path=DATA_DIR):
+    users = scan_users(data_path)
+    load = sample_loader(data_path, users)
+    faces, labels, folds, user_folds = [], [], [], []
+    for rank, (folder_name, samples) in enumerate(sorted(users.items())):
+        label = int(folder_name.split("_")[0])
+        loaded = [face for face in load(folder_name, list(samples)) if face is not None]
+        for i, face in enumerate(loaded):
+            faces.append(np.ascontiguousarray(face))
+            labels.append(label)
+            folds.append(i % K_FOLDS)        # هر کاربر در همه دسته‌ها نمونه دارد
+            user_folds.append(rank % K_FOLDS)  # کاربرانی که در یک دسته ثبت‌نام‌نشده فرض می‌شوند
+    return faces, np.array(labels), np.array(folds), np.array(user_folds)
+
+# فریم‌های مصنوعی با چهره‌های داده‌ها روی زمینه تصادفی و جای واقعی هر چهره
+def detection_frames(rng, crops, count=DETECT_FRAMES, size=DETECT_FRAME_SIZE):
+    width, height = size
+    frames = []
+    for _ in range(count):
+        frame = synthetic_background(rng, width, height)
+        boxes = []
+        for cell in range(int(rng.integers(1, 3))):
+            crop = crops[rng.integers(len(crops))]
+            border = int(crop.shape[0] * 0.25)
+            side = int(rng.integers(100, height // 2))
+            x = cell * (width // 2) + int(rng.integers(0, width // 2 - side))
+            y = int(rng.integers(0, height - side))
+            frame[y:y + side, x:x + side] = cv2.resize(padded(crop), (side, side), interpolation=cv2.INTER_LINEAR)
+            scale = side / (crop.shape[0] + 2 * border)
+            boxes.append((x + int(border * scale), y + int(border * scale),
+                          int(crop.shape[1] * scale), int(crop.shape[0] * scale)))
+        frames.append((frame, boxes))
+    return frames
+
+def init_worker(data_path, seed):
+    # موازی‌سازی بین پردازه‌هاست؛ رشته‌های داخلی اوپن‌سی‌وی فقط رقابت ایجاد می‌کنند
+    cv2.setNumThreads(1)
+    faces, labels, folds, user_folds = load_gallery(data_path)
+    worker.update(faces=faces, labels=labels, folds=folds, user_folds=user_folds)
+    worker["face_cascade"] = load_cascade()
+    worker["frames"] = detection_frames(np.random.default_rng(seed), faces) if faces else []
+
+# آموزش روی بقیه دسته‌ها و پیش‌بینی نمونه‌های یک دسته؛ نمونه‌های کاربران کنارگذاشته‌شده
+# (که در گالری این دسته نیستند) برای سنجش پذیرش اشتباه فرد ناشناس استفاده می‌شوند
+def run_lbph(params, fold):
+    radius, neighbors, grid_x, grid_y = params
+    labels, folds, user_folds = worker["labels"], worker["folds"], worker["user_folds"]
+    outsider = user_folds == fold if len(np.unique(labels)) > 1 else np.zeros(len(labels), bool)
+    gallery = np.flatnonzero((folds != fold) & ~outsider)
+    probes = np.flatnonzero(folds == fold)
+
+    start = time.perf_counter()
+    recognizer = cv2.face.LBPHFaceRecognizer_create(radius, neighbors, grid_x, grid_y)
+    recognizer.train([worker["faces"][i] for i in gallery], labels[gallery])
+    train_ms = (time.perf_counter() - start) * 1000
+    # پیش‌بینی با همان ماتچر برداری که برنامه استفاده می‌کند
+    matcher = LbphMatcher(np.vstack(recognizer.getHistograms()), recognizer.getLabels(), radius, neighbors, grid_x, grid_y)
+
+    results, predict_ms = [], []
+    for i in probes:
+        start = time.perf_counter()
+        label, distance = matcher.predict(worker["faces"][i])
+        predict_ms.append((time.perf_counter() - start) * 1000)
+        results.append((bool(outsider[i]), int(labels[i]), int(label), float(distance)))
+    return {"params": params, "train_ms": train_ms, "predict_ms": predict_ms, "results": results}
+
+def run_detect(params):
+    scale_factor, min_neighbors, min_size = params
+    face_cascade = worker["face_cascade"]
+    found = total = false = 0
+    detect_ms = []
+    for frame, boxes in worker["frames"]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        start = time.perf_counter()
+        detections = detect_faces(face_cascade, gray, scale_factor, min_neighbors, min_size)
+        detect_ms.append((time.perf_counter() - start) * 1000)
+        matched = [any(box_iou(d, box) >= DETECT_IOU for d in detections) for box in boxes]
+        found += sum(matched)
+        total += len(boxes)
+        false += sum(not any(box_iou(d, box) >= DETECT_IOU for box in boxes) for d in detections)
+    return {"params": params, "found": found, "total": total, "false": false, "detect_ms": detect_ms}
+
+def run_task(task):
+    kind, args = task
+    return kind, run_lbph(*args) if kind == "lbph" else run_detect(*args)
+
+# جمع نتایج دسته‌ها برای هر ترکیب LBPH و هر آستانه پذیرش
+def summarize_lbph(runs, thresholds):
+    rows = []
+    by_params = {}
+    for run in runs:
+        by_params.setdefault(run["params"], []).append(run)
+    for (radius, neighbors, grid_x, grid_y), fold_runs in sorted(by_params.items()):
+        results = [r for run in fold_runs for r in run["results"]]
+        genuine = [(true, label, distance) for outsider, true, label, distance in results if not outsider]
+        impostor = [distance for outsider, _, _, distance in results if outsider]
+        predict = summarize([ms for run in fold_runs for ms in run["predict_ms"]])
+        for threshold in thresholds:
+            correct = sum(label == true and distance < threshold for true, label, distance in genuine)
+            accepted = sum(distance < threshold for distance in impostor)
+            rows.append({
+                "radius": radius, "neighbors": neighbors, "grid_x": grid_x, "grid_y": grid_y,
+                "threshold": threshold,
+                "accuracy": round(correct / len(genuine), 4) if genuine else None,
+                "false_accept_rate": round(accepted / len(impostor), 4) if impostor else None,
+                "genuine_probes": len(genuine),
+                "impostor_probes": len(impostor),
+                "train_ms": round(float(np.mean([run["train_ms"] for run in fold_runs])), 3),
+                "predict_p50_ms": predict["p50_ms"],
+                "predict_p95_ms": predict["p95_ms"],
+            })
+    return rows
+
+def summarize_detect(runs):
+    rows = []
+    for run in sorted(runs, key=lambda run: run["params"]):
+        scale_factor, min_neighbors, min_size = run["params"]
+        detect = summarize(run["detect_ms"])
+        rows.append({
+            "scale_factor": scale_factor, "min_neighbors": min_neighbors, "min_size": list(min_size),
+            "recall": round(run["found"] / run["total"], 4) if run["total"] else None,
+            "false_per_frame": round(run["false"] / len(run["detect_ms"]), 3) if run["detect_ms"] else None,
+            "detect_p50_ms": detect["p50_ms"],
+            "detect_p95_ms": detect["p95_ms"],
+        })
+    return rows
+
+# سریع‌ترین ترکیبی که به هدف دقت می‌رسد
+def fastest(rows, meets, key):
+    candidates = [row for row in rows if meets(row)]
+    return min(candidates, key=lambda row: row[key]) if candidates else None
+
+def run_sweep(data_path=DATA_DIR, output_path="param_sweep.json", workers=None, target_accuracy=TARGET_ACCURACY,
+              max_far=MAX_FAR, target_recall=TARGET_RECALL, seed=SEED):
+    start = time.perf_counter()
+    lbph_grid = [(radius, neighbors, gx, gy) for radius, neighbors, (gx, gy) in itertools.product(RADII, NEIGHBORS, GRIDS)]
+    detect_grid = list(itertools.product(SCALE_FACTORS, MIN_NEIGHBORS, MIN_SIZES))
+    tasks = [("lbph", (params, fold)) for params in lbph_grid for fold in range(K_FOLDS)]
+    tasks += [("detect", (params,)) for params in detect_grid]
+
+    lbph_runs, detect_runs = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(data_path, seed)) as pool:
+        for i, (kind, result) in enumerate(pool.map(run_task, tasks), 1):
+            (lbph_runs if kind == "lbph" else detect_runs).append(result)
+            if i % 20 == 0 or i == len(tasks):
+                print(f"   {i}/{len(tasks)} کار انجام شد", file=sys.stderr)
+
+    if not lbph_runs or not lbph_runs[0]["results"]:
+        sys.exit(f"[×] نمونه‌ای برای ارزیابی در '{data_path}' یافت نشد.")
+    recognition = summarize_lbph(lbph_runs, THRESHOLDS)
+    detection = summarize_detect(detect_runs)
+    best_lbph = fastest(recognition, lambda row: (row["accuracy"] or 0) >= target_accuracy
+                        and (row["false_accept_rate"] is None or row["false_accept_rate"] <= max_far), "predict_p50_ms")
+    best_detect = fastest(detection, lambda row: (row["recall"] or 0) >= target_recall, "detect_p50_ms")
+
+    report = {
+        "folds": K_FOLDS,
+        "cpu_count": os.cpu_count(),
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "targets": {"accuracy": target_accuracy, "max_false_accept_rate": max_far, "recall": target_recall},
+        "current": {"recognition": CURRENT_LBPH, "detection": CURRENT_DETECT},
+        "recommended": {"recognition": best_lbph, "detection": best_detect},
+        "recognition": recognition,
+        "detection": detection,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"[✔] {len(lbph_grid)} ترکیب LBPH × {len(THRESHOLDS)} آستانه و {len(detect_grid)} ترکیب تشخیص "
+          f"در {report['elapsed_s']} ثانیه ارزیابی شد: '{output_path}'")
+    if best_lbph:
+        print(f"   شناسایی: radius={best_lbph['radius']} neighbors={best_lbph['neighbors']} "
+              f"grid={best_lbph['grid_x']}x{best_lbph['grid_y']} آستانه {best_lbph['threshold']} → "
+              f"دقت {best_lbph['accuracy']}، پذیرش اشتباه {best_lbph['false_accept_rate']}، "
+              f"پیش‌بینی {best_lbph['predict_p50_ms']}ms")
+    else:
+        print("[!] هیچ ترکیب LBPH به هدف دقت و پذیرش اشتباه نرسید.")
+    if best_detect:
+        print(f"   تشخیص: scaleFactor={best_detect['scale_factor']} minNeighbors={best_detect['min_neighbors']} "
+              f"minSize={tuple(best_detect['min_size'])} → بازیابی {best_detect['recall']}، "
+              f"{best_detect['detect_p50_ms']}ms")
+    else:
+        print("[!] هیچ ترکیب تشخیص به هدف بازیابی نرسید.")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="جست‌وجوی موازی تنظیمات LBPH، Haar Cascade و آستانه پذیرش")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--output", default="param_sweep.json")
+    parser.add_argument("--workers", type=int, default=None, help="تعداد پردازه‌ها (پیش‌فرض: همه هسته‌ها)")
+    parser.add_argument("--target-accuracy", type=float, default=TARGET_ACCURACY)
+    parser.add_argument("--max-far", type=float, default=MAX_FAR, help="حداکثر نرخ پذیرش اشتباه افراد ناشناس")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL)
+    args = parser.parse_args()
+    run_sweep(args.data, args.output, args.workers, args.target_accuracy, args.max_far, args.target_recall)
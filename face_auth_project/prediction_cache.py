@@ -0,0 +1,76 @@
+import time
+from collections import Counter, deque
+from face_detector import box_iou
+
+CONFIDENCE_THRESHOLD = 70   # فاصله کمتر از این مقدار یعنی چهره شناخته شده است
+MAX_AGE = 0.3               # عمر نتیجه ذخیره‌شده برای هر ردیاب (ثانیه)
+DRIFT_IOU = 0.6             # اگر کادر بیش از این جابه‌جا شود دوباره پیش‌بینی می‌شود
+VOTE_WINDOW = 5             # تعداد آخرین پیش‌بینی‌هایی که در رأی‌گیری شمرده می‌شوند
+VOTES_NEEDED = 3            # حداقل رأی یکسان برای پذیرش کاربر
+
+# نگه‌داشتن نتیجه recognizer.predict برای هر چهره ردیابی‌شده و رأی‌گیری بین چند فریم
+class PredictionCache:
+    def __init__(self, recognizer, threshold=CONFIDENCE_THRESHOLD, max_age=MAX_AGE, drift_iou=DRIFT_IOU,
+                 vote_window=VOTE_WINDOW, votes_needed=VOTES_NEEDED):
+        self.recognizer = recognizer
+        self.threshold = threshold
+        self.max_age = max_age
+        self.drift_iou = drift_iou
+        self.vote_window = vote_window
+        self.votes_needed = votes_needed
+        self.entries = {}
+
+        self.lookups = 0
+        self.predict_calls = 0
+
+    # جایگزینی مدل در حین اجرا (پس از آموزش دوباره)؛ نتایج و رأی‌های مدل قبلی کنار گذاشته می‌شوند
+    def set_recognizer(self, recognizer):
+        self.recognizer = recognizer
+        self.entries.clear()
+
+    # پیش‌بینی فقط برای ردیاب جدید، جابه‌جاشده یا نتیجه منقضی‌شده اجرا می‌شود
+    def lookup(self, track_id, box, gray):
+        self.lookups += 1
+        now = time.monotonic()
+        entry = self.entries.get(track_id)
+        if entry is not None and now - entry["time"] < self.max_age and box_iou(entry["box"], box) >= self.drift_iou:
+            return entry["label"], entry["confidence"]
+
+        x, y, w, h = box
+        label, confidence = self.recognizer.predict(gray[y:y + h, x:x + w])
+        self.predict_calls += 1
+
+        if entry is None:
+            entry = {"votes": deque(maxlen=self.vote_window)}
+            self.entries[track_id] = entry
+        entry.update(box=box, time=now, label=label, confidence=confidence)
+        entry["votes"].append(label if confidence < self.threshold else None)
+        return label, confidence
+
+    # برچسبی که در پنجره رأی‌گیری به حد نصاب رسیده، یا None
+    def accepted_label(self, track_id):
+        entry = self.entries.get(track_id)
+        if entry is None:
+            return None
+        votes = Counter(vote for vote in entry["votes"] if vote is not None)
+        if not votes:
+            return None
+        label, count = votes.most_common(1)[0]
+        return label if count >= self.votes_needed else None
+
+    # پنجره رأی‌گیری پر شده و هیچ برچسبی پذیرفته نشده است
+    def rejected(self, track_id):
+        entry = self.entries.get(track_id)
+        return (entry is not None and len(entry["votes"]) == self.vote_window
+                and self.accepted_label(track_id) is None)
+
+    # حذف ردیاب‌هایی که دیگر در فریم نیستند
+    def prune(self, active_track_ids):
+        for track_id in list(self.entries):
+            if track_id not in active_track_ids:
+                del self.entries[track_id]
+
+    def report(self):
+        saved = 100.0 * (1 - self.predict_calls / self.lookups) if self.lookups else 0.0
+        print(f"[⏱] پیش‌بینی چهره: {self.predict_calls} فراخوانی predict برای {self.lookups} چهره "
+              f"({saved:.0f}% از کش)")
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from model_manager import MODEL_PATH, ModelManager
+from lbph_matcher import load_matcher
+from label_index import LabelIndex
+from face_detector import load_cascade
+from prediction_cache import CONFIDENCE_THRESHOLD
+from batch_recognize import worker, recognize_frame
+
+HOST = "127.0.0.1"
+PORT = 8765
+QUEUE_SIZE = 64               # درخواست‌های منتظر؛ اگر صف پر باشد درخواست تازه فوراً با 503 رد می‌شود
+MAX_BATCH = 8                 # حداکثر فریم در هر دسته ارسالی به پردازه‌ها
+BATCH_WAIT = 0.005            # حداکثر انتظار برای پر شدن دسته (ثانیه)
+DEFAULT_DEADLINE_MS = 1000    # مهلت پیش‌فرض هر درخواست؛ با سرآیند X-Deadline-Ms قابل تغییر است
+MAX_BODY = 5 * 1024 * 1024
+REPORT_INTERVAL = 10.0        # فاصله گزارش تأخیر و عمق صف (ثانیه)
+LATENCY_WINDOW = 2048         # تعداد آخرین درخواست‌ها در محاسبه صدک‌های تأخیر
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+# هر پردازه یک بار Cascade و مدل را بارگذاری می‌کند؛ مدل پس از آموزش دوباره بدون راه‌اندازی دوباره سرویس عوض می‌شود
+def init_worker(model_path, threshold):
+    # موازی‌سازی بین پردازه‌هاست؛ رشته‌های داخلی اوپن‌سی‌وی فقط رقابت ایجاد می‌کنند
+    cv2.setNumThreads(1)
+    worker["face_cascade"] = load_cascade()
+    worker["model_manager"] = ModelManager(model_path, loader=load_matcher)
+    worker["recognizer"] = worker["model_manager"].get()
+    worker["label_index"] = LabelIndex(model_path)
+    worker["threshold"] = threshold
+
+# کدگشایی و شناسایی یک دسته فریم در پردازه کارگر؛ برای فریم خراب None برمی‌گردد
+def recognize_batch(payloads):
+    worker["recognizer"] = worker["model_manager"].get()
+    results = []
+    for payload in payloads:
+        frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            results.append(None)
+            continue
+        results.append([{key: value for key, value in row.items() if key not in ("source", "frame")}
+                        for row in recognize_frame("request", 0, frame)])
+    return results
+
+class ServerStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"requests": 0, "ok": 0, "rejected": 0, "timeouts": 0, "bad_requests": 0, "errors": 0}
+        self.batches = 0
+        self.batched = 0
+        self.last_report = time.monotonic()
+        self.last_requests = 0
+
+    def snapshot(self, queue_depth, in_flight):
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        waits = np.asarray(self.queue_waits) if self.queue_waits else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return dict(self.counts, **{
+            "queue_depth": queue_depth,
+            "batches_in_flight": in_flight,
+            "mean_batch_size": round(self.batched / self.batches, 2) if self.batches else 0.0,
+            "latency_p50_ms": round(float(p50), 2),
+            "latency_p95_ms": round(float(p95), 2),
+            "latency_p99_ms": round(float(p99), 2),
+            "queue_wait_p50_ms": round(float(np.percentile(waits, 50)), 2),
+        })
+
+# سرویس HTTP محلی: فریم کدگذاری‌شده (JPEG/PNG) با POST /recognize دریافت می‌شود؛ درخواست‌های هم‌زمان
+# در دسته‌های کوچک روی پردازه‌های کارگر اجرا می‌شوند و هر درخواست مهلت خودش را دارد
+class RecognitionServer:
+    def __init__(self, model_path=MODEL_PATH, host=HOST, port=PORT, workers=None, queue_size=QUEUE_SIZE,
+                 max_batch=MAX_BATCH, batch_wait=BATCH_WAIT, threshold=CONFIDENCE_THRESHOLD):
+        self.model_path = model_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.threshold = threshold
+        self.stats = ServerStats()
+        self.in_flight = 0
+
+    async def serve(self, duration=None):
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                        initargs=(self.model_path, self.threshold))
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # هر پردازه حداکثر یک دسته در دست دارد؛ بقیه درخواست‌ها در صف محدود منتظر می‌مانند
+        self.slots = asyncio.Semaphore(self.workers)
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        tasks = [asyncio.create_task(self.batcher()), asyncio.create_task(self.reporter())]
+        print(f"[🔍] سرویس شناسایی روی http://{self.host}:{self.port} با {self.workers} پردازه آماده است.")
+        try:
+            async with server:
+                if duration:
+                    await asyncio.sleep(duration)
+                else:
+                    await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await loop.run_in_executor(None, self.pool.shutdown)
+            print(self.report_line())
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split()
+                if len(parts) != 3:
+                    await self.respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    return
+                method, path, version = parts
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                length = int(length) if length.isdigit() else -1
+                if length < 0:
+                    await self.respond(writer, 400, {"error": "bad content-length"}, keep_alive=False)
+                    return
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {"error": "frame too large"}, keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                status, payload = await self.route(method, path.split("?", 1)[0], headers, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, headers, body):
+        if path == "/recognize":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            try:
+                deadline_ms = float(headers.get("x-deadline-ms", DEFAULT_DEADLINE_MS))
+            except ValueError:
+                return 400, {"error": "bad x-deadline-ms"}
+            return await self.recognize(body, deadline_ms)
+        if path == "/stats" and method == "GET":
+            return 200, self.stats.snapshot(self.queue.qsize(), self.in_flight)
+        if path == "/health" and method == "GET":
+            return 200, {"status": "ok"}
+        return 404, {"error": "not found"}
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write((f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def recognize(self, payload, deadline_ms):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.stats.counts["requests"] += 1
+        if not payload:
+            self.stats.counts["bad_requests"] += 1
+            return 400, {"error": "empty frame"}
+
+        future = loop.create_future()
+        deadline = start + deadline_ms / 1000
+        try:
+            self.queue.put_nowait((payload, deadline, future, start))
+        except asyncio.QueueFull:
+            self.stats.counts["rejected"] += 1
+            return 503, {"error": "queue full", "queue_depth": self.queue.qsize()}
+
+        try:
+            faces, queued_ms = await asyncio.wait_for(future, max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            # future لغو می‌شود؛ اگر هنوز در صف باشد، batcher آن را کنار می‌گذارد
+            self.stats.counts["timeouts"] += 1
+            return 504, {"error": "deadline exceeded", "deadline_ms": deadline_ms}
+        except Exception as error:
+            self.stats.counts["errors"] += 1
+            return 503, {"error": str(error)}
+        if faces is None:
+            self.stats.counts["bad_requests"] += 1
+            return 400, {"error": "frame could not be decoded"}
+
+        latency_ms = (loop.time() - start) * 1000
+        self.stats.counts["ok"] += 1
+        self.stats.latencies.append(latency_ms)
+        self.stats.queue_waits.append(queued_ms)
+        return 200, {"faces": faces, "latency_ms": round(latency_ms, 2), "queue_ms": round(queued_ms, 2)}
+
+    # ابتدا منتظر یک پردازه آزاد، سپس جمع کردن درخواست‌های صف در یک دسته؛ زیر بار، دسته‌ها بزرگ‌تر می‌شوند
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+            if self.batch_wait > 0 and self.queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.batch_wait)
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # درخواست‌هایی که مهلتشان گذشته یا لغو شده‌اند اجرا نمی‌شوند
+            now = loop.time()
+            live = [item for item in batch if not item[2].done() and item[1] > now]
+            if not live:
+                self.slots.release()
+                continue
+            self.in_flight += 1
+            asyncio.create_task(self.run_batch(live))
+
+    async def run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            results = await loop.run_in_executor(self.pool, recognize_batch, [item[0] for item in batch])
+            for (_, _, future, enqueued), faces in zip(batch, results):
+                if not future.done():
+                    future.set_result((faces, (started - enqueued) * 1000))
+        except Exception as error:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self.stats.batches += 1
+            self.stats.batched += len(batch)
+            self.in_flight -= 1
+            self.slots.release()
+
+    def report_line(self):
+        s = self.stats.snapshot(self.queue.qsize(), self.in_flight)
+        now = time.monotonic()
+        rate = (s["requests"] - self.stats.last_requests) / max(1e-9, now - self.stats.last_report)
+        self.stats.last_report, self.stats.last_requests = now, s["requests"]
+        return (f"[⏱] {rate:.1f} درخواست بر ثانیه، تأخیر p50 {s['latency_p50_ms']}ms p95 {s['latency_p95_ms']}ms، "
+                f"صف {s['queue_depth']}، میانگین دسته {s['mean_batch_size']}، "
+                f"رد {s['rejected']}، مهلت‌گذشته {s['timeouts']}")
+
+    async def reporter(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            if self.stats.counts["requests"] != self.stats.last_requests:
+                print(self.report_line())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سرویس محلی شناسایی چهره: ارسال فریم با POST /recognize")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="تعداد پردازه‌ها (پیش‌فرض: تعداد هسته‌ها)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT * 1000)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--duration", type=float, default=None, help="مدت اجرا (ثانیه)؛ پیش‌فرض تا Ctrl+C")
+    args = parser.parse_args()
+    if not os.path.exists(args.model):
+        sys.exit("[×] فایل مدل یافت نشد. ابتدا مدل را آموزش دهید.")
+    server = RecognitionServer(args.model, args.host, args.port, args.workers, args.queue_size, args.max_batch,
+                               args.batch_wait_ms / 1000, args.threshold)
+    try:
+        asyncio.run(server.serve(args.duration))
+    except KeyboardInterrupt:
+        print("[!] توقف سرویس...")
@@ -0,0 +1,24 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+
+# ماژول‌های پروژه با نام خودشان ایمپورت می‌شوند (مثل اجرای اسکریپت‌ها از پوشه پروژه)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# چهره‌های ساختگی: برای هر کاربر یک الگوی صاف‌شده ثابت و برای هر نمونه کمی نویز
+def synthetic_faces(users=3, per_user=5, size=(100, 100), seed=0):
+    rng = np.random.default_rng(seed)
+    faces, labels = [], []
+    for user in range(users):
+        base = cv2.GaussianBlur(rng.integers(0, 256, size, dtype=np.uint8), (7, 7), 0)
+        for _ in range(per_user):
+            noise = rng.normal(0, 12, size)
+            faces.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+            labels.append(user + 1)
+    return faces, labels
+
+@pytest.fixture
+def faces():
+    return synthetic_faces()
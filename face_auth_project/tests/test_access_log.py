@@ -0,0 +1,49 @@
+import csv
+import os
+from access_log import AccessLogWriter, query_logs
+
+def write_rows(db_path, rows, csv_path="missing.csv"):
+    writer = AccessLogWriter(db_path, csv_path)
+    for user_id, user_name, logged_at in rows:
+        writer.write(user_id, user_name, logged_at)
+    writer.close()
+
+def test_pagination_covers_every_row_once(tmp_path):
+    db_path = str(tmp_path / "log.db")
+    # چند ردیف با زمان یکسان تا مرتب‌سازی ثانویه بر اساس id هم آزموده شود
+    rows = [(str(i % 3), f"user{i % 3}", f"2024-01-0{1 + i // 4} 10:00:00") for i in range(10)]
+    write_rows(db_path, rows)
+
+    seen, after = [], None
+    while True:
+        page = query_logs(limit=3, after=after, db_path=db_path)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1][3], page[-1][0])
+    assert len(seen) == 10
+    assert len({row[0] for row in seen}) == 10
+    assert [(row[3], row[0]) for row in seen] == sorted(((row[3], row[0]) for row in seen), reverse=True)
+
+def test_filters(tmp_path):
+    db_path = str(tmp_path / "log.db")
+    write_rows(db_path, [("1", "ali", "2024-01-01 09:00:00"), ("2", "sara", "2024-01-02 09:00:00"),
+                         ("1", "ali", "2024-01-03 09:00:00")])
+    assert [row[3] for row in query_logs(user_id=1, db_path=db_path)] == ["2024-01-03 09:00:00", "2024-01-01 09:00:00"]
+    assert [row[1] for row in query_logs(start="2024-01-02", end="2024-01-02 23:59:59", db_path=db_path)] == ["2"]
+    assert query_logs(db_path=str(tmp_path / "none.db")) == []
+
+def test_legacy_csv_imported_once(tmp_path):
+    db_path = str(tmp_path / "log.db")
+    csv_path = str(tmp_path / "log.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["1", "ali", "2024-01-01 09:00:00"], ["2", "sara", "2024-01-02 09:00:00"]])
+
+    write_rows(db_path, [], csv_path)
+    assert not os.path.exists(csv_path)
+    assert os.path.exists(csv_path + ".imported")
+    assert len(query_logs(db_path=db_path)) == 2
+
+    # نویسنده بعدی فایل تغییرنام‌یافته را دوباره منتقل نمی‌کند
+    write_rows(db_path, [("3", "reza", "2024-01-03 09:00:00")], csv_path)
+    assert len(query_logs(db_path=db_path)) == 3
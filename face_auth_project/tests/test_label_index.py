@@ -0,0 +1,42 @@
+import json
+from label_index import LabelIndex, labels_path, save_label_index
+
+STAMP = [100, 1_700_000_000_000_000_000]
+
+def test_round_trip_with_padded_ids(tmp_path):
+    model_path = str(tmp_path / "model.yml")
+    users = {"02_ali": {"1.jpg": STAMP, "2.jpg": STAMP}, "7_sara": {"1.jpg": STAMP}}
+    save_label_index(users, str(tmp_path), model_path)
+
+    index = LabelIndex(model_path)
+    assert index.get(2)["name"] == "ali"
+    assert index.get(2)["samples"] == 2
+    assert index.get(7)["folder"] == "7_sara"
+    assert index.get(3) is None
+
+    # زمان ثبت‌نام در ذخیره بعدی حفظ می‌شود، حتی با آیدی دارای صفر ابتدایی
+    with open(labels_path(model_path), encoding="utf-8") as f:
+        entries = json.load(f)
+    entries["2"]["enrolled_at"] = "2020-01-01 00:00:00"
+    with open(labels_path(model_path), "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    save_label_index(users, str(tmp_path), model_path)
+    assert LabelIndex(model_path).get(2)["enrolled_at"] == "2020-01-01 00:00:00"
+
+def test_rename_and_remove(tmp_path):
+    model_path = str(tmp_path / "model.yml")
+    save_label_index({"5_reza": {"1.jpg": STAMP}}, str(tmp_path), model_path)
+    index = LabelIndex(model_path)
+    index.rename("05", "mohammad")
+    assert LabelIndex(model_path).get(5)["name"] == "mohammad"
+    index.remove(5)
+    assert LabelIndex(model_path).get(5) is None
+
+def test_duplicate_ids_share_one_entry(tmp_path):
+    model_path = str(tmp_path / "model.yml")
+    users = {"3_reza": {"1.jpg": STAMP}, "3_ali": {"1.jpg": STAMP, "2.jpg": STAMP}}
+    save_label_index(users, str(tmp_path), model_path)
+    entry = LabelIndex(model_path).get(3)
+    assert entry["folder"] == "3_ali"
+    assert entry["samples"] == 3
+    assert entry["duplicates"] == ["3_reza"]
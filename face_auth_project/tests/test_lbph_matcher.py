@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+from conftest import synthetic_faces
+from model_manager import binary_model_path, save_model
+from lbph_matcher import LbphMatcher, load_matcher
+
+@pytest.fixture
+def model_path(tmp_path, faces):
+    images, labels = faces
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(images, np.array(labels, dtype=np.int32))
+    path = str(tmp_path / "model.yml")
+    save_model(recognizer, path)
+    return path
+
+def test_matcher_agrees_with_opencv_predict(model_path, faces):
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    matcher = LbphMatcher.from_model(model_path)
+
+    images, _ = faces
+    probes = [cv2.flip(face, 1) for face in images] + synthetic_faces(seed=1)[0]
+    for probe in probes:
+        expected_label, expected_distance = recognizer.predict(probe)
+        label, distance = matcher.predict(probe)
+        assert label == expected_label
+        assert distance == pytest.approx(expected_distance, rel=1e-5)
+
+def test_match_returns_k_nearest_in_order(model_path, faces):
+    matcher = LbphMatcher.from_model(model_path)
+    best = matcher.match([faces[0][0]], k=3)[0]
+    assert len(best) == 3
+    assert [distance for _, distance in best] == sorted(distance for _, distance in best)
+    assert best[0] == (faces[1][0], pytest.approx(0.0, abs=1e-6))
+
+def test_load_matcher_uses_binary_model_when_current(model_path):
+    assert isinstance(load_matcher(model_path), LbphMatcher)
+
+def test_load_matcher_falls_back_without_source_stamp(model_path):
+    path = binary_model_path(model_path)
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files if name != "source_stamp"}
+    np.savez(path, **arrays)
+    assert not isinstance(load_matcher(model_path), LbphMatcher)
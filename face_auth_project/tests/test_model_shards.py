@@ -0,0 +1,59 @@
+import os
+import cv2
+from conftest import synthetic_faces
+from lbph_matcher import LbphMatcher
+from model_shards import shard_file
+from train_model import train_model, update_model
+
+def quiet(message):
+    pass
+
+def write_user(data_dir, folder_name, faces, start=1):
+    folder = os.path.join(data_dir, folder_name)
+    os.makedirs(folder, exist_ok=True)
+    for i, face in enumerate(faces, start):
+        cv2.imwrite(os.path.join(folder, f"{i}.png"), face)
+
+# سطرهای مدل بدون توجه به ترتیب: (برچسب، هیستوگرام)
+def model_rows(model_path):
+    matcher = LbphMatcher.from_model(model_path)
+    return sorted((int(label), histogram.tobytes()) for label, histogram in zip(matcher.labels, matcher.histograms))
+
+def test_incremental_update_matches_full_train(tmp_path):
+    data_dir = str(tmp_path / "data")
+    cache_dir = str(tmp_path / "cache")
+    model_path = str(tmp_path / "model.yml")
+    faces, _ = synthetic_faces(users=4, per_user=4)
+    write_user(data_dir, "1_ali", faces[0:3])
+    write_user(data_dir, "2_sara", faces[4:7])
+    write_user(data_dir, "3_reza", faces[8:11])
+    assert train_model(data_dir, model_path, quiet, cache_dir)
+    untouched = os.stat(shard_file(model_path, 2)).st_mtime_ns
+
+    # افزودن نمونه، حذف کاربر، تغییر نام کاربر و کاربر تازه
+    write_user(data_dir, "1_ali", [faces[3]], start=4)
+    for name in os.listdir(os.path.join(data_dir, "3_reza")):
+        os.remove(os.path.join(data_dir, "3_reza", name))
+    os.rmdir(os.path.join(data_dir, "3_reza"))
+    os.rename(os.path.join(data_dir, "2_sara"), os.path.join(data_dir, "2_mina"))
+    write_user(data_dir, "4_amir", faces[12:16])
+    assert update_model(data_dir, model_path, quiet, cache_dir)
+
+    full_path = str(tmp_path / "full.yml")
+    assert train_model(data_dir, full_path, quiet, cache_dir)
+    assert model_rows(model_path) == model_rows(full_path)
+    assert {label for label, _ in model_rows(model_path)} == {1, 2, 4}
+    # تغییر نام بخش کاربر را دوباره نمی‌سازد و بخش کاربر حذف‌شده پاک می‌شود
+    assert os.stat(shard_file(model_path, 2)).st_mtime_ns == untouched
+    assert not os.path.exists(shard_file(model_path, 3))
+
+def test_update_without_changes_keeps_model(tmp_path):
+    data_dir = str(tmp_path / "data")
+    model_path = str(tmp_path / "model.yml")
+    faces, _ = synthetic_faces(users=2, per_user=3)
+    write_user(data_dir, "1_ali", faces[:3])
+    write_user(data_dir, "2_sara", faces[3:])
+    assert train_model(data_dir, model_path, quiet, str(tmp_path / "cache"))
+    written = os.stat(model_path).st_mtime_ns
+    assert update_model(data_dir, model_path, quiet, str(tmp_path / "cache"))
+    assert os.stat(model_path).st_mtime_ns == written
@@ -0,0 +1,61 @@
+import os
+import cv2
+import numpy as np
+import packed_store
+from conftest import synthetic_faces
+
+def test_write_append_and_read(tmp_path):
+    packed_dir = str(tmp_path)
+    faces, _ = synthetic_faces(users=1, per_user=4)
+    packed_store.write_user("3_ali", faces[:3], packed_dir)
+    # نمونه‌های با اندازه دیگر هنگام نوشتن هم‌اندازه می‌شوند
+    packed_store.append_user("3_ali", [cv2.resize(faces[3], (120, 120))], packed_dir)
+
+    stored = packed_store.read_user("3_ali", packed_dir)
+    assert stored.shape == (4, 100, 100)
+    for face, packed in zip(faces[:3], stored):
+        assert np.array_equal(face, packed)
+    created_ns = packed_store.load_manifest(packed_dir)["users"]["3_ali"]["created_ns"]
+    assert packed_store.scan_packed(packed_dir) == {"3_ali": {str(i): [0, created_ns] for i in range(4)}}
+    assert packed_store.read_user("9_none", packed_dir).shape == (0, 100, 100)
+
+def test_same_id_does_not_collide(tmp_path):
+    packed_dir = str(tmp_path)
+    faces, _ = synthetic_faces(users=2, per_user=2)
+    packed_store.write_user("5_ali", faces[:2], packed_dir)
+    packed_store.write_user("5_reza", faces[2:], packed_dir)
+    assert np.array_equal(packed_store.read_user("5_ali", packed_dir)[0], faces[0])
+    assert np.array_equal(packed_store.read_user("5_reza", packed_dir)[0], faces[2])
+
+def test_rename_and_remove(tmp_path):
+    packed_dir = str(tmp_path)
+    faces, _ = synthetic_faces(users=2, per_user=2)
+    packed_store.write_user("5_ali", faces[:2], packed_dir)
+    assert packed_store.rename_user("5_ali", "5_sara", packed_dir)
+    assert packed_store.list_users(packed_dir) == ["5_sara"]
+
+    # کاربر تازه با نام قبلی فایل کاربر تغییرنام‌یافته را بازنویسی نمی‌کند
+    packed_store.write_user("5_ali", faces[2:], packed_dir)
+    assert np.array_equal(packed_store.read_user("5_sara", packed_dir)[1], faces[1])
+    assert not packed_store.rename_user("5_ali", "5_sara", packed_dir)
+
+    assert packed_store.remove_user("5_sara", packed_dir)
+    assert not packed_store.remove_user("5_sara", packed_dir)
+    assert packed_store.list_users(packed_dir) == ["5_ali"]
+    assert sorted(os.listdir(packed_dir)) == ["5_ali.faces", packed_store.MANIFEST_NAME]
+
+def test_migrate(tmp_path):
+    data_dir = tmp_path / "data"
+    packed_dir = str(tmp_path / "packed")
+    faces, labels = synthetic_faces(users=2, per_user=3)
+    for face, label in zip(faces, labels):
+        folder = data_dir / f"{label}_user{label}"
+        folder.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(folder / f"{len(os.listdir(folder)) + 1}.png"), face)
+    (data_dir / "notes").mkdir()
+
+    packed_store.migrate(str(data_dir), packed_dir)
+    assert sorted(packed_store.list_users(packed_dir)) == ["1_user1", "2_user2"]
+    loaded, loaded_labels = packed_store.load_packed_data(packed_dir)
+    assert sorted(loaded_labels) == sorted(labels)
+    assert np.array_equal(packed_store.read_user("2_user2", packed_dir)[0], faces[3])
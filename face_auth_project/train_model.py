@@ -1,46 +1,120 @@
-import cv2
 import os
-import numpy as np
+import sys
+from training_data import CACHE_DIR, scan_data_folder, decode_images, load_cache, load_training_data
+from model_shards import shards_path, sync_shards, combine_shards
+from ann_index import index_is_current, save_index, update_index
+from label_index import save_label_index
+import packed_store
 
-def prepare_training_data(data_folder_path):
-    faces = []
-    labels = []
+# مسیرهای داده و مدل
+DATA_DIR = "data"
+MODEL_PATH = "trained_model.yml"
+
+# نتیجه build_model وقتی هیچ بخشی تغییر نکرده و مدل بازنویسی نشده است
+UNCHANGED = "unchanged"
+
+# کاربران و نمونه‌ها از مخزن فشرده (اگر مهاجرت انجام شده باشد) یا از پوشه داده
+def scan_users(data_path):
+    packed_dir = packed_store.packed_path(data_path)
+    if packed_store.enabled(packed_dir):
+        return packed_store.scan_packed(packed_dir)
+    return scan_data_folder(data_path)
 
-    for folder_name in os.listdir(data_folder_path):
-        if not os.path.isdir(os.path.join(data_folder_path, folder_name)):
-            continue
+# خواندن نمونه‌ها از مخزن فشرده؛ فایل هر کاربر فقط یک بار نگاشت می‌شود
+def packed_loader(packed_dir):
+    manifest = packed_store.load_manifest(packed_dir)
 
-        label = int(folder_name.split("_")[0])
-        folder_path = os.path.join(data_folder_path, folder_name)
+    def load(folder_name, names):
+        packed = packed_store.read_user(folder_name, packed_dir, manifest)
+        return [packed[int(name)] for name in names]
 
-        for image_name in os.listdir(folder_path):
-            image_path = os.path.join(folder_path, image_name)
-            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    return load
 
+# خواندن نمونه‌های یک کاربر برای ساخت بخش مدل: از نگاشت فایل فشرده، یا از کش تصاویر و در غیر این صورت کدگشایی
+def sample_loader(data_path, users, cache_dir=CACHE_DIR):
+    packed_dir = packed_store.packed_path(data_path)
+    if packed_store.enabled(packed_dir):
+        return packed_loader(packed_dir)
+
+    cached, pixels = load_cache(cache_dir)
+
+    def load(folder_name, names):
+        faces = [None] * len(names)
+        missing = []
+        for i, name in enumerate(names):
+            entry = cached.get(f"{folder_name}/{name}")
+            if entry is not None and entry[0] == users[folder_name][name]:
+                offset, (h, w) = entry[1], entry[2]
+                if offset >= 0:
+                    faces[i] = pixels[offset:offset + h * w].reshape(h, w)
+            else:
+                missing.append(i)
+        paths = [os.path.join(data_path, folder_name, names[i]) for i in missing]
+        for i, path, image in zip(missing, paths, decode_images(paths)):
             if image is None:
-                print(f"[!] خواندن تصویر شکست خورد: {image_path}")
-                continue
+                print(f"[!] خواندن تصویر شکست خورد: {path}")
+            faces[i] = image
+        return faces
 
-            faces.append(image)
-            labels.append(label)
+    return load
 
+def prepare_training_data(data_folder_path):
+    faces, labels, _ = load_training_data(data_folder_path)
     return faces, labels
 
-def train_model():
-    print("🧠 در حال آموزش مدل تشخیص چهره...")
+# ساخت مدل از بخش‌های هر کاربر؛ فقط بخش کاربرانی که نمونه‌هایشان اضافه، حذف یا عوض شده دوباره محاسبه می‌شود
+# و بخش کاربران حذف‌شده کنار گذاشته می‌شود. با full=True همه بخش‌ها از نو ساخته می‌شوند
+def build_model(data_path, model_path, full, progress, cache_dir=CACHE_DIR):
+    users = scan_users(data_path)
+    if full and not packed_store.enabled(packed_store.packed_path(data_path)):
+        # کش تصاویر یک بار به‌روز می‌شود تا ساخت بخش‌ها فقط از آن بخواند
+        progress(f"📂 خواندن تصاویر {len(users)} کاربر...")
+        load_training_data(data_path, cache_dir, users=users)
 
-    data_path = "data"
-    faces, labels = prepare_training_data(data_path)
+    changed, computed, removed = sync_shards(users, sample_loader(data_path, users, cache_dir), model_path, full)
+    if not full and not changed and removed == 0 and os.path.exists(model_path):
+        save_label_index(users, data_path, model_path)
+        progress("[✔] مدل به‌روز است؛ تصویر جدیدی برای آموزش وجود ندارد.")
+        return UNCHANGED
 
-    if len(faces) == 0:
-        print("[×] هیچ چهره‌ای برای آموزش پیدا نشد!")
-        return
+    progress(f"🧠 {computed} تصویر در بخش {len(changed)} کاربر محاسبه شد؛ بخش {removed} کاربر حذف شد.")
+    progress("💾 ترکیب بخش‌ها و ذخیره مدل...")
+    # شاخص تقریبی فقط در آموزش کامل از نو خوشه‌بندی می‌شود؛ در به‌روزرسانی فقط نمونه‌های کاربران تغییرکرده جای‌گذاری می‌شوند
+    incremental_index = not full and index_is_current(model_path)
+    if not combine_shards(model_path):
+        progress("[×] هیچ چهره‌ای برای آموزش پیدا نشد!")
+        return False
+    if incremental_index:
+        update_index(model_path, changed)
+    else:
+        save_index(model_path)
+    save_label_index(users, data_path, model_path)
+    return True
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.train(faces, np.array(labels))
-    recognizer.save("trained_model.yml")
+# progress پیام‌های پیشرفت را دریافت می‌کند (پیش‌فرض چاپ در خروجی؛ رابط گرافیکی آن را در وضعیت نشان می‌دهد)
+def train_model(data_path=DATA_DIR, model_path=MODEL_PATH, progress=print, cache_dir=CACHE_DIR):
+    progress("🧠 در حال آموزش مدل تشخیص چهره...")
+    if not build_model(data_path, model_path, True, progress, cache_dir):
+        return False
+    progress(f"[✔] آموزش مدل با موفقیت انجام شد و ذخیره شد به عنوان '{model_path}'.")
+    return True
 
-    print("[✔] آموزش مدل با موفقیت انجام شد و ذخیره شد به عنوان 'trained_model.yml'.")
+# به‌روزرسانی تدریجی: هزینه متناسب با کاربرانی است که تغییر کرده‌اند، نه اندازه کل گالری؛
+# حذف یا تغییر نام کاربر دیگر آموزش کامل لازم ندارد
+def update_model(data_path=DATA_DIR, model_path=MODEL_PATH, progress=print, cache_dir=CACHE_DIR):
+    if not os.path.exists(shards_path(model_path)):
+        progress("[!] بخش‌های مدل پیدا نشد؛ آموزش کامل انجام می‌شود.")
+        return train_model(data_path, model_path, progress, cache_dir)
+    result = build_model(data_path, model_path, False, progress, cache_dir)
+    if result == UNCHANGED:
+        return True
+    if not result:
+        return False
+    progress(f"[✔] مدل به‌روزرسانی شد و ذخیره شد به عنوان '{model_path}'.")
+    return True
 
 if __name__ == "__main__":
-    train_model()
+    if len(sys.argv) >= 2 and sys.argv[1] == "--update":
+        update_model()
+    else:
+        train_model()
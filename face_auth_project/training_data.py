@@ -0,0 +1,144 @@
+import cv2
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# مسیر کش تصاویر خوانده‌شده: یک آرایه پیوسته از پیکسل‌ها و یک فهرست
+DATA_DIR = "data"
+CACHE_DIR = "data_cache"
+CACHE_PIXELS = "faces.npy"
+CACHE_INDEX = "index.npz"
+
+# فهرست پوشه‌ها و فایل‌های داده به همراه اندازه و زمان تغییر هر فایل
+def scan_data_folder(data_folder_path):
+    users = {}
+    if not os.path.exists(data_folder_path):
+        return users
+
+    for folder_name in os.listdir(data_folder_path):
+        folder_path = os.path.join(data_folder_path, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+
+        files = {}
+        for image_name in os.listdir(folder_path):
+            stat = os.stat(os.path.join(folder_path, image_name))
+            files[image_name] = [stat.st_size, stat.st_mtime_ns]
+        users[folder_name] = files
+
+    return users
+
+# خواندن موازی تصاویر خاکستری؛ cv2.imread هنگام کدگشایی قفل GIL را آزاد می‌کند
+def decode_images(image_paths, workers=None):
+    if len(image_paths) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(lambda path: cv2.imread(path, cv2.IMREAD_GRAYSCALE), image_paths))
+
+def load_cache(cache_dir):
+    index_path = os.path.join(cache_dir, CACHE_INDEX)
+    pixels_path = os.path.join(cache_dir, CACHE_PIXELS)
+    if not os.path.exists(index_path) or not os.path.exists(pixels_path):
+        return {}, None
+
+    with np.load(index_path) as index:
+        keys = index["keys"].tolist()
+        stamps = index["stamps"].tolist()
+        offsets = index["offsets"].tolist()
+        shapes = index["shapes"].tolist()
+        failed = index["failed_keys"].tolist() if "failed_keys" in index.files else []
+        failed_stamps = index["failed_stamps"].tolist() if "failed_stamps" in index.files else []
+    pixels = np.load(pixels_path, mmap_mode="r")
+
+    entries = {}
+    for key, stamp, offset, shape in zip(keys, stamps, offsets, shapes):
+        entries[key] = (stamp, offset, shape)
+    # فایل‌هایی که کدگشایی‌شان شکست خورده با offset منفی ثبت می‌شوند و تا تغییر فایل دوباره خوانده نمی‌شوند
+    for key, stamp in zip(failed, failed_stamps):
+        entries[key] = (stamp, -1, (0, 0))
+    return entries, pixels
+
+# نوشتن کش در فایل موقت و جایگزینی اتمی تا کش نیمه‌کاره باقی نماند
+def save_cache(cache_dir, keys, stamps, faces, failed=()):
+    os.makedirs(cache_dir, exist_ok=True)
+
+    sizes = [face.size for face in faces]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    pixels = np.concatenate([face.ravel() for face in faces]) if faces else np.zeros(0, np.uint8)
+
+    pixels_tmp = os.path.join(cache_dir, "faces.tmp.npy")
+    index_tmp = os.path.join(cache_dir, "index.tmp.npz")
+    np.save(pixels_tmp, pixels)
+    np.savez(index_tmp,
+             keys=np.array(keys, dtype=str),
+             stamps=np.array(stamps, dtype=np.int64).reshape(-1, 2),
+             offsets=offsets,
+             shapes=np.array([face.shape for face in faces], dtype=np.int64).reshape(-1, 2),
+             failed_keys=np.array([key for key, _ in failed], dtype=str),
+             failed_stamps=np.array([stamp for _, stamp in failed], dtype=np.int64).reshape(-1, 2))
+    os.replace(pixels_tmp, os.path.join(cache_dir, CACHE_PIXELS))
+    os.replace(index_tmp, os.path.join(cache_dir, CACHE_INDEX))
+
+# بارگذاری داده‌های آموزش: فقط فایل‌های جدید یا تغییرکرده کدگشایی می‌شوند و بقیه از کش نگاشت می‌شوند
+def load_training_data(data_folder_path=DATA_DIR, cache_dir=CACHE_DIR, workers=None, users=None):
+    timings = {}
+
+    start = time.perf_counter()
+    if users is None:
+        users = scan_data_folder(data_folder_path)
+    keys, stamps, labels = [], [], []
+    for folder_name, files in users.items():
+        label = int(folder_name.split("_")[0])
+        for image_name, stamp in files.items():
+            keys.append(f"{folder_name}/{image_name}")
+            stamps.append(stamp)
+            labels.append(label)
+    timings["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached, pixels = load_cache(cache_dir)
+    faces = [None] * len(keys)
+    missing = []
+    for i, (key, stamp) in enumerate(zip(keys, stamps)):
+        entry = cached.get(key)
+        if entry is not None and entry[0] == stamp:
+            offset, (h, w) = entry[1], entry[2]
+            if offset >= 0:
+                faces[i] = pixels[offset:offset + h * w].reshape(h, w)
+        else:
+            missing.append(i)
+    hits = len(keys) - len(missing)
+    timings["cache"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = decode_images([os.path.join(data_folder_path, keys[i]) for i in missing], workers)
+    for i, image in zip(missing, decoded):
+        if image is None:
+            print(f"[!] خواندن تصویر شکست خورد: {os.path.join(data_folder_path, keys[i])}")
+        faces[i] = image
+    timings["decode"] = time.perf_counter() - start
+
+    valid = [i for i, face in enumerate(faces) if face is not None]
+    failed = [(keys[i], stamps[i]) for i, face in enumerate(faces) if face is None]
+    keys = [keys[i] for i in valid]
+    stamps = [stamps[i] for i in valid]
+    labels = [labels[i] for i in valid]
+    faces = [faces[i] for i in valid]
+
+    start = time.perf_counter()
+    # کش فقط وقتی بازنویسی می‌شود که فایلی تازه خوانده شده یا فایلی از داده‌ها حذف شده باشد
+    if missing or len(cached) != len(keys) + len(failed):
+        # داده‌های نگاشت‌شده قبل از بازنویسی کش به حافظه منتقل می‌شوند (در ویندوز فایل باز قابل جایگزینی نیست)
+        faces = [np.array(face) for face in faces]
+        pixels = None
+        save_cache(cache_dir, keys, stamps, faces, failed)
+    timings["save"] = time.perf_counter() - start
+
+    print(f"⏱ بارگذاری {len(faces)} تصویر ({len(missing)} کدگشایی، {hits} از کش): "
+          + "، ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in timings.items()))
+
+    return faces, labels, timings
+
+if __name__ == "__main__":
+    load_training_data()
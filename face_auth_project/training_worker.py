@@ -0,0 +1,61 @@
+import queue
+import threading
+import time
+import traceback
+from train_model import train_model, update_model
+
+# آموزش مدل در یک رشته پس‌زمینه در همان پردازه؛ درخواست‌هایی که حین آموزش می‌رسند
+# در یک اجرای بعدی ادغام می‌شوند (اگر یکی از آن‌ها آموزش کامل بخواهد، اجرای بعدی کامل است)
+class BackgroundTrainer:
+    def __init__(self, model_manager=None):
+        self.model_manager = model_manager
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pending = None
+        self.generation = 0    # با هر آموزش موفق یکی زیاد می‌شود؛ جلسه‌های تشخیص با آن مدل را عوض می‌کنند
+
+    def busy(self):
+        return self.thread is not None
+
+    # برمی‌گرداند آیا آموزش همین حالا شروع شد یا به اجرای بعدی اضافه شد
+    def request(self, full=False):
+        mode = "full" if full else "update"
+        with self.lock:
+            if self.thread is not None:
+                self.pending = "full" if "full" in (self.pending, mode) else mode
+                return False
+            self.thread = threading.Thread(target=self._run, args=(mode,), name="BackgroundTrainer", daemon=True)
+            self.thread.start()
+            return True
+
+    def _run(self, mode):
+        while mode is not None:
+            self._train(mode)
+            with self.lock:
+                mode, self.pending = self.pending, None
+                if mode is None:
+                    self.thread = None
+
+    def _train(self, mode):
+        start = time.perf_counter()
+        progress = lambda message: self.events.put(("progress", message))
+        try:
+            trained = train_model(progress=progress) if mode == "full" else update_model(progress=progress)
+            if trained and self.model_manager is not None:
+                # مدل جدید همین‌جا بارگذاری می‌شود تا رشته رابط کاربری منتظر خواندن فایل نماند
+                self.model_manager.get()
+                self.generation += 1
+            self.events.put(("done" if trained else "error", mode, time.perf_counter() - start))
+        except Exception:
+            traceback.print_exc()
+            self.events.put(("error", mode, time.perf_counter() - start))
+
+    # رویدادهای آموزش برای رشته اصلی Tk؛ با root.after به طور دوره‌ای فراخوانی می‌شود
+    def poll(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+import traceback
+from frame_grabber import FrameGrabber
+
+WARMUP_CAMERA_TIMEOUT = 5.0   # حداکثر انتظار برای اولین فریم دوربین هنگام آماده‌سازی (ثانیه)
+WARM_CAMERA_IDLE = 60.0       # دوربین آماده‌شده اگر تا این مدت استفاده نشود بسته می‌شود (ثانیه)
+
+# آماده‌سازی منابع کند در رشته پس‌زمینه پس از نمایش پنجره: مراحل بارگذاری (Cascade، مدل، فهرست برچسب‌ها)،
+# باز کردن دوربین پیش‌فرض و یک تشخیص/پیش‌بینی آزمایشی روی اولین فریم؛ هزینه شروع سرد از اولین ورود برداشته می‌شود
+class Warmup:
+    def __init__(self, steps, camera_source=None, probe=None, camera_timeout=WARMUP_CAMERA_TIMEOUT,
+                 camera_idle=WARM_CAMERA_IDLE):
+        self.steps = steps                  # فهرست (نام، تابع)
+        self.camera_source = camera_source
+        self.probe = probe                  # probe(frame)؛ frame اگر دوربین در دسترس نباشد None است
+        self.camera_timeout = camera_timeout
+        self.camera_idle = camera_idle
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.handed_over = threading.Event()   # دوربین تحویل داده یا آماده‌سازی بسته شد
+        self.thread = None
+        self.camera = None
+        self.closed = False
+        self.timings = {}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="Warmup", daemon=True)
+        self.thread.start()
+        return self
+
+    def ready(self):
+        return self.finished.is_set()
+
+    def _step(self, name, step, *args):
+        start = time.perf_counter()
+        try:
+            result = step(*args)
+        except Exception:
+            traceback.print_exc()
+            self.events.put(("error", name))
+            result = None
+        self.timings[name] = (time.perf_counter() - start) * 1000
+        self.events.put(("progress", name, self.timings[name]))
+        return result
+
+    def _run(self):
+        start = time.perf_counter()
+        for name, step in self.steps:
+            self._step(name, step)
+        frame = None
+        if self.camera_source is not None:
+            frame = self._step("camera", self._open_camera)
+        if self.probe is not None:
+            self._step("probe", self.probe, frame)
+        self.timings["total"] = (time.perf_counter() - start) * 1000
+        print("[⏱] آماده‌سازی: " + "، ".join(f"{name} {ms:.0f}ms" for name, ms in self.timings.items()))
+        self.finished.set()
+        self.events.put(("done", self.timings["total"]))
+
+        # دوربینی که تا camera_idle استفاده نشود در همین رشته بسته می‌شود؛ آزادسازی تا یک ثانیه
+        # منتظر رشته خواندن فریم می‌ماند و نباید رشته Tk را متوقف کند
+        if self.camera is not None and not self.handed_over.wait(self.camera_idle):
+            with self.lock:
+                camera, self.camera = self.camera, None
+            if camera is not None:
+                camera.release()
+
+    # باز کردن دوربین و انتظار برای اولین فریم؛ دوربین برای اولین جلسه باز می‌ماند
+    def _open_camera(self):
+        camera = FrameGrabber(self.camera_source).start()
+        deadline = time.monotonic() + self.camera_timeout
+        while time.monotonic() < deadline:
+            ret, frame = camera.read()
+            if ret:
+                with self.lock:
+                    if self.closed:
+                        camera.release()
+                    else:
+                        self.camera = camera
+                return frame
+            time.sleep(0.01)
+        camera.release()
+        print(f"[!] آماده‌سازی: فریمی از دوربین {self.camera_source} دریافت نشد.")
+        return None
+
+    # تحویل دوربین آماده‌شده به جلسه‌ای که همان منبع را می‌خواهد؛ در غیر این صورت None
+    def take_camera(self, source):
+        with self.lock:
+            if self.camera is None or source != self.camera_source:
+                return None
+            camera, self.camera = self.camera, None
+            self.handed_over.set()
+            return camera
+
+    # رویدادهای آماده‌سازی برای رشته اصلی Tk؛ پس از رویداد done رویداد دیگری نمی‌آید
+    def poll(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            camera, self.camera = self.camera, None
+            self.handed_over.set()
+        if camera is not None:
+            camera.release()